@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+""" Headless benchmarks of pyview, results are printed as JSON
+
+    ./benchmarks/bench.py [--quick] [--only append,frame,...] [--out FILE] [--compare BASE.json]
+
+Every result is a record {"bench", "params", "value", "unit"}; with --compare
+the records are matched by bench and params against an earlier run and the
+ones which got worse by more than --tolerance are reported, exit code is 1 then.
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import matplotlib.pyplot as plt
+
+from sview.window import Window
+from sview.sources import random_walk
+
+_WIDTH = 1600
+_HEIGHT = 900
+_HIGHER_IS_BETTER = ('samples/s',)
+
+
+def _median_time(func, repeat):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+def _create(ax, kind, name, **kw):
+    if kind == 'line':
+        return ax.add_line(name, **kw)
+    if kind == 'scatter':
+        return ax.add_scatter(name, **kw)
+    return ax.add_text_channel(name, **kw)
+
+def _feed(ch, kind, tms, values):
+    if kind == 'text':
+        ch.update_from_arrays(tms, ["{:.3f}".format(v) for v in values])
+    else:
+        ch.update_from_arrays(tms, values)
+
+def _window(streams, channels, points, kind = 'line', blit = False, time_window = None, **kw):
+    # a headless window never blits, with blit the window gets pyplot's Agg canvas
+    win = Window(headless=not blit, blit=blit)
+    win.figure.set_size_inches(_WIDTH / 100, _HEIGHT / 100)
+    for k in range(streams):
+        s = win.create_stream("s{}".format(k), time_window=time_window)
+        ax = s.add_axes("%.2f")
+        for c in range(channels):
+            ch = _create(ax, kind, "ch{}".format(c), **kw)
+            _feed(ch, kind, *random_walk(points, seed=k*channels+c))
+    win.layout(_WIDTH, _HEIGHT)
+    return win
+
+
+def bench_append(quick):
+    """ samples per second fed one by one and in batches, per channel type """
+    n = 20000 if quick else 200000
+    for kind in ('line', 'scatter', 'text'):
+        for batch in (1, 100, 10000):
+            win = _window(1, 0, 0)
+            ch = _create(win.streams[0].add_axes("%.2f"), kind, "ch")
+            tms, values = random_walk(n if batch > 1 else n // 10)
+            start = time.perf_counter()
+            if batch == 1:
+                if kind == 'text':
+                    for tm, v in zip(tms.tolist(), values.tolist()):
+                        ch.update_from_str(tm, "{:.3f}".format(v))
+                else:
+                    for tm, v in zip(tms.tolist(), values.tolist()):
+                        ch.update_from_str(tm, v)
+            else:
+                for i in range(0, len(tms), batch):
+                    _feed(ch, kind, tms[i:i+batch], values[i:i+batch])
+            spent = time.perf_counter() - start
+            yield 'append', dict(kind=kind, batch=batch), len(tms) / spent, 'samples/s'
+
+def bench_frame(quick):
+    """ Window.prepare_artists and the canvas draw after new samples came to every channel """
+    repeat = 3 if quick else 5
+    sizes = (1000, 100000) if quick else (1000, 100000, 1000000)
+    for streams in ((1, 4) if quick else (1, 4, 16)):
+        for points in sizes:
+            for lod in (None, 'minmax'):
+                win = _window(streams, 2, points, lod=lod)
+                win.figure.canvas.draw()
+                chs = [ch for s in win.streams for ch in s.channels]
+                last = [ch.datax[-1] for ch in chs]
+
+                def feed(i):
+                    for k, ch in enumerate(chs):
+                        tms, values = random_walk(10, start=last[k] + (i*10 + 1)*1e3, seed=i)
+                        ch.update_from_arrays(tms, values)
+
+                prepare = []
+                draw = []
+                for i in range(repeat):
+                    feed(i)
+                    prepare.append(_median_time(lambda i: win.prepare_artists(), 1))
+                    draw.append(_median_time(lambda i: win.figure.canvas.draw(), 1))
+                    win.changed_streams = {}
+                params = dict(streams=streams, channels=2, points=points, lod=lod)
+                yield 'frame.prepare', params, float(np.median(prepare)) * 1e3, 'ms'
+                yield 'frame.draw', params, float(np.median(draw)) * 1e3, 'ms'
+
+def bench_blit(quick):
+    """ Window.render after new samples came to some or all of the streams, blitting against full redraws """
+    repeat = 8 if quick else 24
+    for time_window in (None, 60):
+        for fed in (3, 12):
+            for blit in (False, True):
+                win = _window(12, 2, 10000, blit=blit, time_window=time_window)
+                win.render()
+                win.figure.canvas.draw()
+                chs = [ch for s in win.streams[:fed] for ch in s.channels]
+                last = [ch.datax[-1] for ch in chs]
+                draws = []
+                win.figure.canvas.mpl_connect('draw_event', lambda event: draws.append(1))
+
+                def frame(i):
+                    for k, ch in enumerate(chs):
+                        tms, values = random_walk(10, start=last[k] + (i*10 + 1)*1e3, seed=i)
+                        ch.update_from_arrays(tms, values)
+                    win.render()
+
+                spent = _median_time(frame, repeat)
+                params = dict(streams=12, fed=fed, time_window=time_window, blit=blit)
+                yield 'blit.frame', params, spent * 1e3, 'ms'
+                yield 'blit.full_draws', params, len(draws) / repeat, 'per frame'
+                if blit:
+                    plt.close(win.figure)
+
+def bench_zoom(quick):
+    """ Stream.set_xrange to a random tenth of the data """
+    repeat = 20 if quick else 100
+    for points in ((1000, 100000) if quick else (1000, 100000, 1000000, 10000000)):
+        if quick and points > 100000:
+            continue
+        win = _window(1, 4, points)
+        s = win.streams[0]
+        rng = np.random.default_rng(0)
+        span = points * 1e3
+        x0 = rng.random(repeat) * span * 0.9
+        spent = _median_time(lambda i: s.set_xrange(x0[i], x0[i] + span / 10), repeat)
+        yield 'zoom', dict(channels=4, points=points), spent * 1e3, 'ms'
+
+def bench_hover(quick):
+    """ Stream._format_coord, the status line shown while the mouse moves """
+    repeat = 200 if quick else 2000
+    for points in ((1000, 100000) if quick else (1000, 100000, 1000000)):
+        for channels in (1, 8):
+            win = _window(1, channels, points)
+            s = win.streams[0]
+            ax = s.axes[0]
+            x = np.random.default_rng(0).random(repeat) * points * 1e3
+            spent = _median_time(lambda i: s._format_coord(ax, x[i], 0.0), repeat)
+            yield 'hover', dict(channels=channels, points=points), spent * 1e6, 'us'
+
+            # the mouse moving across the axes, a few events per pixel
+            x0, x1 = ax.get_xlim()
+            x = x0 + np.arange(repeat) * (x1 - x0) / ax.bbox.width / 4
+            spent = _median_time(lambda i: s._format_coord(ax, x[i], 0.0), repeat)
+            yield 'hover_sweep', dict(channels=channels, points=points), spent * 1e6, 'us'
+
+def bench_memory(quick):
+    """ memory held per stored sample, fed in batches of 1000 """
+    n = 100000 if quick else 1000000
+    for kind, kw in (('line', {}), ('line', dict(dtype='float32')), ('line', dict(lod='minmax')),
+                     ('line', dict(hot_points=20000)), ('scatter', {}), ('text', {})):
+        win = _window(1, 0, 0)
+        ax = win.streams[0].add_axes("%.2f")
+        tms, values = random_walk(n)
+        if kind == 'text':
+            values = ["{:.3f}".format(v) for v in values]
+
+        gc.collect()
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        ch = _create(ax, kind, "ch", **kw)
+        for i in range(0, n, 1000):
+            ch.update_from_arrays(tms[i:i+1000], values[i:i+1000])
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        params = dict(kind=kind, points=n, **kw)
+        yield 'memory', params, (current - base) / n, 'bytes/sample'
+        yield 'memory.peak', params, (peak - base) / n, 'bytes/sample'
+
+BENCHMARKS = {
+    'append': bench_append,
+    'frame': bench_frame,
+    'blit': bench_blit,
+    'zoom': bench_zoom,
+    'hover': bench_hover,
+    'memory': bench_memory,
+}
+
+
+def _key(rec):
+    return rec['bench'] + json.dumps(rec['params'], sort_keys=True)
+
+def compare(results, base, tolerance):
+    """ records of results which are worse than in base by more than tolerance (a fraction) """
+    old = {_key(r): r for r in base['results']}
+    worse = []
+    for rec in results['results']:
+        prev = old.get(_key(rec))
+        if not prev or not prev['value']:
+            continue
+        ratio = rec['value'] / prev['value']
+        if rec['unit'] in _HIGHER_IS_BETTER:
+            ratio = 1.0 / ratio if ratio else float('inf')
+        if ratio > 1.0 + tolerance:
+            worse.append(dict(rec, base=prev['value'], ratio=ratio))
+    return worse
+
+def run(names, quick):
+    results = []
+    for name in names:
+        for bench, params, value, unit in BENCHMARKS[name](quick):
+            results.append(dict(bench=bench, params=params, value=value, unit=unit))
+            print("{:14} {:60} {:14.3f} {}".format(bench, json.dumps(params, sort_keys=True), value, unit), file=sys.stderr)
+
+    return {
+        'meta': {
+            'time': time.time(),
+            'quick': quick,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='pyview benchmarks')
+    parser.add_argument('--quick', action='store_true', help='smaller sizes, for a fast check')
+    parser.add_argument('--only', default=','.join(BENCHMARKS), help='comma separated: ' + ', '.join(BENCHMARKS))
+    parser.add_argument('--out', help='write the JSON there instead of stdout')
+    parser.add_argument('--compare', help='JSON of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown with --compare, 0.2 is 20%%')
+    args = parser.parse_args()
+
+    names = [n for n in args.only.split(',') if n]
+    for n in names:
+        if not n in BENCHMARKS:
+            raise Exception("Unknown benchmark: {}".format(n))
+
+    results = run(names, args.quick)
+    text = json.dumps(results, indent=1)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            worse = compare(results, json.load(f), args.tolerance)
+        for rec in worse:
+            print("worse: {} {} {:.3f} {} (was {:.3f}, x{:.2f})".format(rec['bench'], json.dumps(rec['params'], sort_keys=True),
+                  rec['value'], rec['unit'], rec['base'], rec['ratio']), file=sys.stderr)
+        if worse:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
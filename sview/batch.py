@@ -0,0 +1,49 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from concurrent.futures import ProcessPoolExecutor
+
+# Renders many dashboards to image files on all cores. A job is a tuple
+# (build, path) or (build, path, save_args): build() is a picklable callable
+# (a module level function or a functools.partial of one) which returns a
+# Window created with headless=True and filled with data, path is where the
+# image goes and save_args are passed on to Window.save().
+
+def _render(job):
+    build, path = job[0], job[1]
+    kw = job[2] if len(job) > 2 else {}
+    win = build()
+    win.save(path, **kw)
+    return path
+
+def render_many(jobs, processes=None):
+    """ render all jobs, in a pool of processes (all cores by default) unless processes is 1 """
+    jobs = list(jobs)
+    if processes == 1 or len(jobs) < 2:
+        return [_render(job) for job in jobs]
+
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(_render, jobs))
+
+
+__all__ = ('render_many',)
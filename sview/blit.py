@@ -0,0 +1,120 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from matplotlib.patches import Rectangle
+from matplotlib.transforms import Bbox, TransformedBbox
+
+class Blitter:
+    """ Redraws only the streams that changed since the last frame.
+
+    Channel artists of a blitting window are animated, so a full figure draw
+    leaves them out. After every full draw the background of each axes is
+    saved, then a frame restores the backgrounds of the changed axes and
+    draws the channel artists on top. A stream whose limits, size or title
+    changed since its background was saved gets its own region repainted
+    from scratch, the rest of the figure is left alone; Stream.set_position()
+    clips the tick labels and the title of a stream to its region for that.
+    """
+
+    def __init__(self, win):
+        self.win = win
+        self.figure = win.figure
+        self.canvas = win.figure.canvas
+        self._backgrounds = {}
+
+        self._patch = Rectangle((0, 0), 1, 1, transform=self.figure.transFigure,
+                                facecolor=self.figure.get_facecolor(), edgecolor='none')
+        self._patch.set_figure(self.figure)
+
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def invalidate(self):
+        self._backgrounds = {}
+
+    def _bbox(self, ax):
+        # one pixel wider, for antialiasing at the clip edges
+        x0, y0, x1, y1 = ax.bbox.extents
+        return Bbox.from_extents(x0 - 1, y0 - 1, x1 + 1, y1 + 1)
+
+    def _state(self, ax):
+        return (tuple(ax.get_xlim()), tuple(ax.get_ylim()), tuple(ax.bbox.bounds), ax.get_title())
+
+    def _save(self, ax):
+        self._backgrounds[ax] = (self.canvas.copy_from_bbox(self._bbox(ax)), self._state(ax))
+
+    def _draw_animated(self, stream, ax):
+        for c in stream.channels:
+            if c.axes is ax and getattr(c, 'artist', None):
+                ax.draw_artist(c.artist)
+
+        # channel artists must not cover the legend
+        legend = ax.get_legend()
+        if legend:
+            ax.draw_artist(legend)
+
+    def on_draw(self, event):
+        self._backgrounds = {}
+        for s in self.win.streams:
+            for ax in s.axes:
+                self._save(ax)
+                self._draw_animated(s, ax)
+
+    def _redraw_stream(self, stream):
+        renderer = self.canvas.get_renderer()
+
+        x, y, w, h = stream.region
+        self._patch.set_bounds(x, y, w, h)
+        self._patch.draw(renderer)
+
+        if stream.title_object:
+            stream.title_object.draw(renderer)
+
+        for ax in stream.axes:
+            ax.draw(renderer)
+            self._save(ax)
+            self._draw_animated(stream, ax)
+
+        self.canvas.blit(TransformedBbox(Bbox.from_bounds(x, y, w, h), self.figure.transFigure))
+
+    def update(self, streams):
+        """ draw the given streams, False if the whole figure has to be drawn instead """
+        if not self._backgrounds:
+            return False
+
+        for s in streams:
+            if s.region is None:
+                return False
+
+            saved = [self._backgrounds.get(ax) for ax in s.axes]
+            if all(bg and bg[1] == self._state(ax) for ax, bg in zip(s.axes, saved)):
+                for ax, bg in zip(s.axes, saved):
+                    self.canvas.restore_region(bg[0])
+                    self._draw_animated(s, ax)
+                    self.canvas.blit(self._bbox(ax))
+            else:
+                self._redraw_stream(s)
+
+        return True
+
+
+__all__ = ('Blitter',)
@@ -0,0 +1,232 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import collections
+import lzma
+import zlib
+
+import numpy as np
+
+from .column import Column
+from .lod import minmax_indices
+
+# samples per segment
+SEGMENT = 16384
+# pixel columns of the finer summary of a segment
+_BUCKETS = 64
+
+_CODECS = dict(zlib=(lambda b: zlib.compress(b, 6), zlib.decompress),
+               lzma=(lzma.compress, lzma.decompress))
+
+def _bits(dtype):
+    return np.uint32 if dtype == np.float32 else np.uint64
+
+def _xor_prev(bits):
+    prev = np.empty_like(bits)
+    prev[0] = 0
+    prev[1:] = bits[:-1]
+    return np.bitwise_xor(bits, prev)
+
+def _encode_x(x):
+    # times on a whole microsecond go as the deltas of their deltas, mostly zeros on a steady feed
+    if np.all(x == np.round(x)) and np.all(np.abs(x) < 2.0 ** 62):
+        d = np.diff(x.astype(np.int64), n=1, prepend=0)
+        return True, np.diff(d, n=1, prepend=0).tobytes()
+    return False, _xor_prev(x.view(np.uint64)).tobytes()
+
+def _decode_x(integral, raw):
+    if integral:
+        return np.cumsum(np.cumsum(np.frombuffer(raw, dtype=np.int64))).astype(np.float64)
+    return np.bitwise_xor.accumulate(np.frombuffer(raw, dtype=np.uint64)).view(np.float64)
+
+def _encode_y(y):
+    # neighbouring values share the sign, exponent and top of the mantissa, their xor is mostly zero bits
+    return _xor_prev(y.view(_bits(y.dtype))).tobytes()
+
+def _decode_y(raw, dtype):
+    return np.bitwise_xor.accumulate(np.frombuffer(raw, dtype=_bits(dtype))).view(dtype)
+
+
+class Segment:
+    """ Immutable compressed run of samples with its time bounds and value summary """
+
+    __slots__ = ('t0', 't1', 'count', 'ymin', 'ymax', 'coarse', 'fine', '_integral', '_x', '_y', '_dtype')
+
+    def __init__(self, x, y, compress):
+        self.t0 = float(x[0])
+        self.t1 = float(x[-1])
+        self.count = len(x)
+        self._dtype = y.dtype
+
+        if not np.isnan(y).all():
+            self.ymin, self.ymax = float(np.nanmin(y)), float(np.nanmax(y))
+        else:
+            self.ymin = self.ymax = np.nan
+        # what the min/max level of detail keeps of the segment drawn over one and over
+        # _BUCKETS pixel columns, drawn in place of it while it is that narrow on screen
+        idx = minmax_indices(x, y, self.t0, self.t1, 1)
+        self.coarse = (x[idx], y[idx])
+        idx = minmax_indices(x, y, self.t0, self.t1, _BUCKETS)
+        self.fine = (x[idx], y[idx])
+
+        self._integral, raw = _encode_x(np.asarray(x, dtype=np.float64))
+        self._x = compress(raw)
+        self._y = compress(_encode_y(np.ascontiguousarray(y)))
+
+    @property
+    def nbytes(self):
+        return len(self._x) + len(self._y)
+
+    def decode(self, decompress):
+        return _decode_x(self._integral, decompress(self._x)), _decode_y(decompress(self._y), self._dtype)
+
+
+class ColdStore:
+    """ The older samples of a channel as compressed segments, oldest first.
+
+    Segments are decompressed only for lookups and for views they are wider
+    than a couple of pixels of; the last `cache` decompressed ones are kept.
+    """
+
+    def __init__(self, codec='zlib', cache=8):
+        if not codec in _CODECS:
+            raise Exception("Cold: unknown codec '{}'".format(codec))
+        self._compress, self._decompress = _CODECS[codec]
+        self.segments = []
+        # segment start times, for bisecting, and value bounds
+        self._t0 = Column(np.float64)
+        self._ymin = Column(np.float64)
+        self._ymax = Column(np.float64)
+        self.count = 0
+        self._cache = collections.OrderedDict()
+        self._cache_size = max(int(cache), 1)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return sum(s.nbytes for s in self.segments)
+
+    def add(self, x, y):
+        seg = Segment(x, y, self._compress)
+        self.segments.append(seg)
+        self._t0.append(seg.t0)
+        self._ymin.append(seg.ymin)
+        self._ymax.append(seg.ymax)
+        self.count += seg.count
+
+    def drop_front(self, n):
+        """ drops the n oldest segments """
+        for seg in self.segments[:n]:
+            self.count -= seg.count
+            self._cache.pop(id(seg), None)
+        del self.segments[:n]
+        self._t0.drop_front(n)
+        self._ymin.drop_front(n)
+        self._ymax.drop_front(n)
+
+    def first(self):
+        return self.segments[0].t0 if self.segments else None
+
+    def bounds(self):
+        """ (ymin, ymax) over all segments, NaN if there are no values """
+        if not self.segments:
+            return (np.nan, np.nan)
+        return (np.fmin.reduce(self._ymin.view()), np.fmax.reduce(self._ymax.view()))
+
+    def data(self, seg):
+        key = id(seg)
+        d = self._cache.get(key)
+        if d is None:
+            d = self._cache[key] = seg.decode(self._decompress)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return d
+
+    def _span(self, x0, x1):
+        # segments [i, j) that may hold samples in [x0, x1]
+        t0 = self._t0.view()
+        i = max(int(np.searchsorted(t0, x0, side='right')) - 1, 0)
+        j = int(np.searchsorted(t0, x1, side='right'))
+        return i, j
+
+    def y_range(self, x0, x1):
+        """ (min, max) of the values with times in [x0, x1] """
+        lo = hi = np.nan
+        i, j = self._span(x0, x1)
+        for seg in self.segments[i:j]:
+            if seg.t1 < x0:
+                continue
+            if x0 <= seg.t0 and seg.t1 <= x1:
+                r = (seg.ymin, seg.ymax)
+            else:
+                x, y = self.data(seg)
+                y = y[int(np.searchsorted(x, x0, 'left')):int(np.searchsorted(x, x1, 'right'))]
+                r = (np.fmin.reduce(y), np.fmax.reduce(y)) if len(y) else (np.nan, np.nan)
+            lo, hi = np.fmin(lo, r[0]), np.fmax(hi, r[1])
+        return (lo, hi)
+
+    def around(self, x):
+        """ ((x, y) of the last sample at or before x, (x, y) of the first after it), None where there is none """
+        t0 = self._t0.view()
+        i = int(np.searchsorted(t0, x, side='right')) - 1
+        before = after = None
+        if i >= 0:
+            sx, sy = self.data(self.segments[i])
+            k = int(np.searchsorted(sx, x, side='right'))
+            before = (sx[k - 1], sy[k - 1])
+            if k < len(sx):
+                after = (sx[k], sy[k])
+        if after is None and i + 1 < len(self.segments):
+            sx, sy = self.data(self.segments[i + 1])
+            after = (sx[0], sy[0])
+        return before, after
+
+    def view(self, x0, x1, columns):
+        """ (x, y) to draw [x0, x1] over `columns` pixels, one more segment on each side.
+            A segment goes in full only when it is wider on screen than its summaries """
+        i, j = self._span(x0, x1)
+        i = max(i - 1, 0)
+        j = min(j + 1, len(self.segments))
+        pixel = (x1 - x0) / max(columns, 1)
+        xs = []
+        ys = []
+        for seg in self.segments[i:j]:
+            width = seg.t1 - seg.t0
+            if width < 2 * pixel or seg.t1 < x0 or seg.t0 > x1:
+                x, y = seg.coarse
+            elif width < _BUCKETS / 2 * pixel:
+                x, y = seg.fine
+            else:
+                x, y = self.data(seg)
+            xs.append(x)
+            ys.append(y)
+        if not xs:
+            return np.empty(0), np.empty(0)
+        return np.concatenate(xs), np.concatenate(ys)
+
+
+__all__ = ('ColdStore', 'Segment', 'SEGMENT')
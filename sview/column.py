@@ -0,0 +1,139 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import datetime
+import numpy as np
+
+_MIN_CAPACITY = 64
+
+class Column:
+    """ Contiguous growable array of samples.
+
+    Storage grows by doubling, so appends are amortized O(1) and readers get
+    views into the buffer instead of copies. One spare slot past the end is
+    always kept, it lets a transient point be shown after the data without
+    copying the whole series (see with_tail()). Samples dropped from the front
+    are reclaimed lazily, when the buffer runs out of space at the end.
+    With width set, every sample is a row of that many values.
+    """
+
+    def __init__(self, dtype=np.float64, width=None):
+        shape = (_MIN_CAPACITY,) if width is None else (_MIN_CAPACITY, width)
+        self._buf = np.empty(shape, dtype=dtype)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def _index(self, i):
+        n = self._end - self._start
+        if i < 0:
+            i += n
+        if i < 0 or i >= n:
+            raise IndexError("Column index out of range")
+        return self._start + i
+
+    def __getitem__(self, i):
+        return self._buf[self._index(i)]
+
+    def __setitem__(self, i, v):
+        self._buf[self._index(i)] = v
+
+    @property
+    def dtype(self):
+        return self._buf.dtype
+
+    @property
+    def nbytes(self):
+        return self._buf.nbytes
+
+    def view(self):
+        return self._buf[self._start:self._end]
+
+    def with_tail(self, v):
+        self._buf[self._end] = v
+        return self._buf[self._start:self._end + 1]
+
+    def reserve(self, n):
+        """ make room for n samples past the current end """
+        capacity = len(self._buf)
+        if self._end + n < capacity:
+            return
+
+        count = self._end - self._start
+        if (count + n + 1) * 2 <= capacity:
+            self._buf[:count] = self._buf[self._start:self._end]
+        else:
+            while capacity <= count + n:
+                capacity *= 2
+            buf = np.empty((capacity,) + self._buf.shape[1:], dtype=self._buf.dtype)
+            buf[:count] = self._buf[self._start:self._end]
+            self._buf = buf
+
+        self._start = 0
+        self._end = count
+
+    def append(self, v):
+        if self._end + 1 >= len(self._buf):
+            self.reserve(1)
+        self._buf[self._end] = v
+        self._end += 1
+
+    def extend(self, values):
+        n = len(values)
+        self.reserve(n)
+        self._buf[self._end:self._end + n] = values
+        self._end += n
+
+    def truncate(self, n):
+        self._end = self._start + min(len(self), n)
+
+    def drop_front(self, n):
+        self._start = min(self._start + n, self._end)
+
+
+def as_timestamps(tms):
+    """ Timestamps in microseconds as a float64 array. Accepts numbers (already
+    in microseconds), datetime objects and numpy datetime64 values.
+    """
+    if isinstance(tms, np.ndarray):
+        if np.issubdtype(tms.dtype, np.datetime64):
+            return tms.astype('datetime64[us]').astype(np.int64).astype(np.float64)
+        if tms.dtype != object:
+            return np.asarray(tms, dtype=np.float64)
+
+    tms = list(tms)
+    if tms and isinstance(tms[0], datetime.datetime):
+        return np.array([t.timestamp() * 1e6 for t in tms], dtype=np.float64)
+    return np.asarray(tms, dtype=np.float64)
+
+
+def as_values(values, dtype=np.float64):
+    """ Sample values as an array, None becomes NaN and strings are parsed """
+    if isinstance(values, np.ndarray) and values.dtype != object:
+        return values.astype(dtype, copy=False)
+    return np.array(list(values), dtype=np.float64).astype(dtype, copy=False)
+
+
+__all__ = ('Column', 'as_timestamps', 'as_values')
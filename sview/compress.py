@@ -0,0 +1,167 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import numpy as np
+
+# Lossy compression of a line at ingest. Every sample either becomes a new
+# point or replaces the last stored one, which is kept provisional until the
+# next sample shows whether the segment can be stretched further. Every
+# sample, stored or not, stays within max_error of the drawn line:
+# for deadband with any drawstyle, for swinging_door only when the points are
+# joined by straight lines (line.Channel rejects it with the steps drawstyles)
+#
+#   deadband       a value is stored when it differs from the last stored one
+#                  by more than max_error, the last one is held till then
+#   deadband_rel   the same with max_error a fraction of the last stored value
+#   swinging_door  a segment is stretched while some straight line from its
+#                  start passes within max_error of all samples since
+#
+# NaN (missing) samples are always stored and start a new segment.
+
+class _Compressor:
+    def __init__(self, max_error):
+        if not max_error >= 0:
+            raise Exception("Compress: max_error must be a non-negative number")
+        self.max_error = max_error
+        # samples seen and points stored, replacements not counted
+        self.received = 0
+        self.stored = 0
+        self.reset()
+
+    @property
+    def ratio(self):
+        return self.received / self.stored if self.stored else 1.0
+
+    def add(self, t, v):
+        """ (t, v, replace): the point to store, replace says it replaces the last stored point """
+        self.received += 1
+        t, v, replace = self._add(t, v)
+        if not replace:
+            self.stored += 1
+        return t, v, replace
+
+    def add_many(self, x, y):
+        """ (x, y, replace): the points to store for a batch, replace says the first of them
+            replaces the last stored point """
+        out_x = []
+        out_y = []
+        replace = False
+        for t, v in zip(x.tolist(), y.tolist()):
+            t, v, r = self.add(t, v)
+            if not r:
+                out_x.append(t)
+                out_y.append(v)
+            elif out_x:
+                out_x[-1] = t
+                out_y[-1] = v
+            else:
+                replace = True
+                out_x.append(t)
+                out_y.append(v)
+        return np.array(out_x, dtype=np.float64), np.array(out_y, dtype=np.float64), replace
+
+
+class Deadband(_Compressor):
+    def __init__(self, max_error, relative=False):
+        self.relative = relative
+        _Compressor.__init__(self, max_error)
+
+    def reset(self):
+        self._value = None
+        self._held = False
+
+    def _add(self, t, v):
+        a = self._value
+        if a is not None and v == v and abs(v - a) <= (self.max_error * abs(a) if self.relative else self.max_error):
+            # the stored value is held up to t
+            held = self._held
+            self._held = True
+            return t, a, held
+
+        self._value = v if v == v else None
+        self._held = False
+        return t, v, False
+
+
+class SwingingDoor(_Compressor):
+
+    def reset(self):
+        # start of the segment, the range of slopes that keep all its samples within max_error
+        self._start = None
+        self._up = -np.inf
+        self._low = np.inf
+        self._open = False
+
+    def _add(self, t, v):
+        if v != v:
+            self.reset()
+            return t, v, False
+
+        if self._start is None:
+            self._start = (t, v)
+            return t, v, False
+
+        t0, v0 = self._start
+        dt = t - t0
+        if dt > 0:
+            e = self.max_error
+            up = max(self._up, (v - e - v0) / dt)
+            low = min(self._low, (v + e - v0) / dt)
+            if up <= low:
+                # still one segment, its end moves to t on the slope closest to the sample
+                self._up = up
+                self._low = low
+                slope = min(max((v - v0) / dt, up), low)
+                opened = self._open
+                self._open = True
+                self._last = (t, v0 + slope * dt)
+                return self._last + (opened,)
+
+        # the doors closed: the segment ends at the last stored point, the next starts there
+        if self._open:
+            self._start = self._last
+            self._up = -np.inf
+            self._low = np.inf
+            self._open = False
+            return self._add(t, v)
+
+        self.reset()
+        self._start = (t, v)
+        return t, v, False
+
+
+_MODES = dict(deadband=lambda e: Deadband(e),
+              deadband_rel=lambda e: Deadband(e, relative=True),
+              swinging_door=lambda e: SwingingDoor(e))
+
+def make_compressor(mode, max_error):
+    if mode is None:
+        return None
+    if not mode in _MODES:
+        raise Exception("Compress: unknown mode '{}'".format(mode))
+    if max_error is None:
+        raise Exception("Compress: mode '{}' needs max_error".format(mode))
+    return _MODES[mode](float(max_error))
+
+
+__all__ = ('Deadband', 'SwingingDoor', 'make_compressor')
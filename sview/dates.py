@@ -19,43 +19,91 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-
+import bisect
 import math
 import numpy as np
-
-from datetime import datetime
-
-_WEEKDAYS = "Sun|Mon|Tue|Wed|Thu|Fri|Sat".split("|")
-_MOSCOW_TZ_OFFSET = 3 * 60 * 60 * 1000 * 1000
-
-class Formatter:
+import matplotlib.ticker as mticker
+
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta, tzinfo
+
+_WEEKDAYS = "Mon|Tue|Wed|Thu|Fri|Sat|Sun".split("|")
+_NUM_TICKS = 10
+_LABELS_MAX = 4096
+
+# time zone of the locators without their own, None is the local one
+_tz = None
+
+def _as_tz(tz):
+    if tz is None or isinstance(tz, tzinfo):
+        return tz
+    return timezone(timedelta(hours=tz))
+
+def set_timezone(tz):
+    """ tz: a tzinfo, hours east of UTC or None for the local time """
+    global _tz
+    _tz = _as_tz(tz)
+
+def get_timezone():
+    return _tz
+
+def as_datetime(value, tz=None):
+    return datetime.fromtimestamp(float(value)/1e6, tz or _tz)
+
+_offsets = {}
+
+def utc_offset(value, tz=None):
+    """ offset of the time zone at the given time, microseconds; looked up once per quarter of an hour """
+    tz = tz or _tz
+    key = (tz, int(value // 900000000))
+    offset = _offsets.get(key)
+    if offset is None:
+        try:
+            dt = as_datetime(value, tz)
+            if dt.tzinfo is None:
+                dt = dt.astimezone()
+            offset = int(dt.utcoffset().total_seconds()) * 1000000
+        except (OverflowError, OSError, ValueError):
+            offset = 0
+        if len(_offsets) > _LABELS_MAX:
+            _offsets.clear()
+        _offsets[key] = offset
+    return offset
+
+def fmt_date(value, tz=None):
+    return as_datetime(value, tz).strftime(r"DATE:  %Y/%m/%d   %H:%M:%S.%f     ")
+
+
+class Formatter(mticker.Formatter):
     axis = None
+    profiler = None
 
     def set_axis(self, axis):
         self.axis = axis
 
     def __init__(self, loc):
         self.locator = loc
+        self.width = 0
 
     def __call__(self, x, pos=None):
+        prof = self.profiler
+        if prof is not None and prof.enabled:
+            return prof.call(('ticks',), self._format, x, pos)
+        return self._format(x, pos)
+
+    def _format(self, x, pos):
 
         #print("fmt.off {:,} {:,}".format(x, pos))
         if pos is None:
-            return datetime.fromtimestamp(float(x)/1e6).strftime(r"DATE:  %Y/%m/%d   %H:%M:%S.%f     ")
+            return fmt_date(x, self.locator.tz)
 
         if x < 20:
             return "--"
 
-        width = self.axis.axes.transAxes.transform_point((1, 1))[0] - self.axis.axes.transAxes.transform_point((0, 0))[0]
-
-        if width > 500 or (pos % 2) == 1:
-            return self.locator.fmt(x)
+        if self.width > 500 or (pos % 2) == 1:
+            return label(x, self.locator.step, self.locator.fmt, self.locator.tz)
         return ''
 
-        if pos:
-            return "{}\ntest".format(x)
-        return str(x)
-
     def format_data(self, value):
         return self.__call__(value)
 
@@ -66,39 +114,38 @@ class Formatter:
         return ''
 
     def set_locs(self, locs):
-        self.locs = locs
+        # called once per draw before the labels, the width decides whether every other one is shown
+        self.width = self.axis.axes.bbox.width if self.axis else 0
 
 
-def fmt_sec(value):  return "%ds" % ((int(value)/1000000)%60,)
-def fmt_secf(value): return "%.1fs" % (((int(value)/100000)%600)*0.1,)
+def fmt_sec(value, tz=None):  return "%ds" % ((int(value)/1000000)%60,)
+def fmt_secf(value, tz=None): return "%.1fs" % (((int(value)/100000)%600)*0.1,)
 
-def fmt_ms(value):  return "%dms" % ((int(value)/1000)%1000,)
-def fmt_msf(value):  return "%.1fms" % (((int(value)/100)%10000)*0.1,)
+def fmt_ms(value, tz=None):  return "%dms" % ((int(value)/1000)%1000,)
+def fmt_msf(value, tz=None):  return "%.1fms" % (((int(value)/100)%10000)*0.1,)
 
-def fmt_def(value): return str(value)
-def fmt_us(value):  return "%dus" % (int(value) % 1000,)
+def fmt_def(value, tz=None): return str(value)
+def fmt_us(value, tz=None):  return "%dus" % (int(value) % 1000,)
 
-def fmt_hms(value):
-    return datetime.fromtimestamp(float(value)/1e6).strftime("%H:%M:%Ss")
+def fmt_hms(value, tz=None):
+    return as_datetime(value, tz).strftime("%H:%M:%Ss")
 
-def fmt_hm(value):
-    return datetime.fromtimestamp(float(value)/1e6).strftime("%H:%M")
+def fmt_hm(value, tz=None):
+    return as_datetime(value, tz).strftime("%H:%M")
 
-def fmt_wdhm(value):
-    dt = datetime.fromtimestamp(float(value)/1e6)
+def fmt_wdhm(value, tz=None):
+    dt = as_datetime(value, tz)
     return _WEEKDAYS[dt.weekday()] + dt.strftime(" %H:%M")
 
-def fmt_mdwd(value):
-    dt = datetime.fromtimestamp(float(value)/1e6)
+def fmt_mdwd(value, tz=None):
+    dt = as_datetime(value, tz)
     return dt.strftime("%m/%d ") + _WEEKDAYS[dt.weekday()]
 
-def fmt_ymd(value):
-    dt = datetime.fromtimestamp(float(value)/1e6)
-    return dt.strftime("%Y/%m/%d")
+def fmt_ymd(value, tz=None):
+    return as_datetime(value, tz).strftime("%Y/%m/%d")
 
-def fmt_y(value):
-    dt = datetime.fromtimestamp(float(value)/1e6)
-    return dt.strftime("%Y")
+def fmt_y(value, tz=None):
+    return as_datetime(value, tz).strftime("%Y")
 
 
 _step_limits= [
@@ -145,7 +192,7 @@ _step_limits= [
     (4*60*60*1000000, fmt_hm),
     (6*60*60*1000000, fmt_wdhm),
     (8*60*60*1000000, fmt_wdhm),
-    (12*60*1000000, fmt_wdhm),
+    (12*60*60*1000000, fmt_wdhm),
     (24*60*60*1000000, fmt_mdwd),
     (2*24*60*60*1000000, fmt_mdwd),
     (4*24*60*60*1000000, fmt_mdwd),
@@ -162,13 +209,42 @@ _step_limits= [
     (365*24*60*60*1000000, fmt_y),
 ]
 
-class Locator:
+_steps = [s for s, f in _step_limits]
+_formats = [f for s, f in _step_limits]
+
+
+# labels of the recent ticks, the same ticks come back on every draw while scrolling
+_labels = OrderedDict()
+
+def label(x, step, fmt, tz=None):
+    key = (x, step, tz or _tz)
+    text = _labels.get(key)
+    if text is None:
+        text = _labels[key] = fmt(x, tz)
+        if len(_labels) > _LABELS_MAX:
+            _labels.popitem(last=False)
+    return text
+
+
+class Locator(mticker.Locator):
 
     axis = None
 
     def set_axis(self, axis):
         self.axis = axis
 
+    def __init__(self, tz=None):
+        self._tz = _as_tz(tz)
+        self.step = 1
+        self.fmt = fmt_def
+
+    def set_timezone(self, tz):
+        self._tz = _as_tz(tz)
+
+    @property
+    def tz(self):
+        return self._tz or _tz
+
     def __call__(self):
         #print("NullLocator::__call__(): axis {}".format(self.axis))
         vmin, vmax = self.axis.get_view_interval()
@@ -187,38 +263,27 @@ class Locator:
 
 
     def tick_values(self, vmin, vmax):
-        num = 10
-        step = (vmax - vmin) / num
-
-        self.fmt = fmt_def
-        for i in range(len(_step_limits)):
-            if step <= _step_limits[i][0]:
-                self.fmt = _step_limits[i][1]
-
-                rstep = _step_limits[i][0]
-
-                ivmin = int(vmin) + _MOSCOW_TZ_OFFSET
-                start = ivmin - (ivmin % rstep) - _MOSCOW_TZ_OFFSET
-
-                #print("rstep ", rstep)
-
-                loc = []
-
-                while start < vmax:
-                    loc.append(start)
-                    start = start + rstep
-
-                return loc
-
-        step_seconds = step / 1e6
+        step = (vmax - vmin) / _NUM_TICKS
+        if not (step > 0 and math.isfinite(step)):
+            return []
 
-        v = [i for i in range(num)]
+        i = bisect.bisect_left(_steps, step)
+        if i < len(_steps):
+            rstep = _steps[i]
+            self.fmt = _formats[i]
+        else:
+            # beyond the table: whole numbers of the last step
+            rstep = _steps[-1] * math.ceil(step / _steps[-1])
+            self.fmt = _formats[-1]
+        self.step = rstep
 
-        print(v)
+        # align to the midnight of the time zone
+        offset = utc_offset(vmin, self.tz)
+        ivmin = int(vmin) + offset
+        start = ivmin - (ivmin % rstep) - offset
 
-        #self.data
-        return v
+        return start + rstep * np.arange(max(int(math.ceil((vmax - start) / rstep)), 0), dtype=np.float64)
 
 
 
-__all__ = ('Formatter', 'Locator',)
+__all__ = ('Formatter', 'Locator', 'set_timezone', 'get_timezone')
@@ -0,0 +1,180 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import asyncio
+import threading
+import traceback
+
+from .text import Channel as TextChannel
+
+def parse_record(line):
+    """ default record format: '<channel> <timestamp, us> <value>', the value
+    runs to the end of the line so text channels may contain spaces; it is
+    converted for the channel it goes to, see Feeds._read()
+    """
+    parts = line.strip().split(None, 2)
+    if len(parts) != 3:
+        return None
+    return (parts[0], float(parts[1]), parts[2])
+
+
+class FeedStats:
+    def __init__(self):
+        self.connected = False
+        self.connects = 0
+        self.records = 0
+        self.errors = 0
+        self.unknown = 0
+        self.last_error = None
+
+
+class Feeds:
+    """ Follows line-oriented socket feeds on a background asyncio loop.
+
+    Every feed is a coroutine on one event loop thread, so hundreds of
+    connections don't need hundreds of threads. Records are parsed on that
+    thread and routed by channel name into the ingest buffers of the window,
+    the GUI thread applies them once per frame. A dropped connection is
+    re-established with exponential backoff. When a channel has more than
+    high_water samples waiting for the GUI, the feeds writing to it stop
+    reading, so a slow window pushes back on the producers instead of
+    queueing without bound.
+    """
+
+    def __init__(self, win, parse=parse_record, high_water=100000, min_delay=0.5, max_delay=30.0):
+        self.win = win
+        self.parse = parse
+        self.high_water = high_water
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.buffers = {}
+        # how the values of a channel are converted on the feed thread
+        self.converters = {}
+        self.stats = {}
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = None
+        self._tasks = []
+
+    def add_channel(self, name, channel):
+        # called on the GUI thread, before the feeds write to the channel
+        self.buffers[name] = self.win.ingest_buffer(channel)
+        self.converters[name] = str if isinstance(channel, TextChannel) else float
+
+    def tcp(self, host, port, name=None, parse=None):
+        name = name or "{}:{}".format(host, port)
+        return self._add(name, lambda: asyncio.open_connection(host, port), parse)
+
+    def unix(self, path, name=None, parse=None):
+        return self._add(name or path, lambda: asyncio.open_unix_connection(path), parse)
+
+    def _add(self, name, connect, parse):
+        if name in self.stats:
+            raise Exception("Feed {} has been added already".format(name))
+        stats = self.stats[name] = FeedStats()
+        self.loop.call_soon_threadsafe(self._spawn, self._follow(name, connect, parse or self.parse, stats))
+        return stats
+
+    def _spawn(self, coro):
+        self._tasks.append(self.loop.create_task(coro))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.loop.run_forever, name="sview-feeds", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+
+        async def shutdown():
+            for t in self._tasks:
+                t.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self._thread = None
+        self.loop.close()
+
+    async def _follow(self, name, connect, parse, stats):
+        delay = self.min_delay
+        while True:
+            writer = None
+            try:
+                reader, writer = await connect()
+                stats.connected = True
+                stats.connects += 1
+                delay = self.min_delay
+                await self._read(reader, parse, stats)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stats.last_error = "{}: {}".format(type(e).__name__, e)
+            finally:
+                stats.connected = False
+                if writer is not None:
+                    writer.close()
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_delay)
+
+    async def _read(self, reader, parse, stats):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+
+            try:
+                record = parse(line.decode('utf-8', 'replace'))
+            except Exception:
+                record = None
+                stats.last_error = traceback.format_exc(limit=1)
+
+            if record is None:
+                stats.errors += 1
+                continue
+
+            buf = self.buffers.get(record[0])
+            if buf is None:
+                stats.unknown += 1
+                continue
+
+            try:
+                value = self.converters[record[0]](record[2])
+            except Exception:
+                # a bad value is dropped here, on the GUI thread it would fail the whole batch
+                stats.errors += 1
+                stats.last_error = traceback.format_exc(limit=1)
+                continue
+
+            buf.put(record[1], value)
+            stats.records += 1
+
+            while buf.pending > self.high_water:
+                await asyncio.sleep(0.05)
+
+
+__all__ = ('Feeds', 'FeedStats', 'parse_record')
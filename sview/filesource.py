@@ -0,0 +1,190 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import mmap
+import os
+
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+
+# Numeric CSV files: the first column is the timestamp, every other column is
+# a line channel. An optional header line names the channels. Timestamps are
+# microseconds like everywhere else, values that look like seconds are scaled.
+#
+#   time,cpu,mem
+#   1466000000000000,0.25,1200
+#   1466000001000000,0.5,1210
+
+_CHUNK = 32 * 1024 * 1024
+_PARALLEL_SIZE = 4 * _CHUNK
+_SECONDS_LIMIT = 1e11
+
+def _parse_slow(data, ncols):
+    rows = []
+    for line in data.splitlines():
+        fields = line.split(b',')
+        if len(fields) != ncols:
+            continue
+        try:
+            rows.append([float(f) if f.strip() else np.nan for f in fields])
+        except ValueError:
+            continue
+    return np.array(rows, dtype=np.float64).reshape(-1, ncols)
+
+def _fields_match(data, ncols):
+    # every line has ncols - 1 commas, otherwise ragged lines could add up to the right total
+    b = np.frombuffer(data, dtype=np.uint8)
+    commas = np.searchsorted(np.flatnonzero(b == ord(',')), np.flatnonzero(b == ord('\n')))
+    return bool(np.all(np.diff(commas, prepend=0) == ncols - 1))
+
+def parse_rows(data, ncols):
+    """ CSV lines (each ending with a newline) to an array of ncols columns """
+    if not data.strip():
+        return np.empty((0, ncols))
+    try:
+        values = np.fromstring(data.replace(b'\n', b','), dtype=np.float64, sep=',')
+        if len(values) == data.count(b'\n') * ncols and _fields_match(data, ncols):
+            return values.reshape(-1, ncols)
+    except ValueError:
+        pass
+    # empty fields or junk somewhere in the chunk
+    return _parse_slow(data, ncols)
+
+def _parse_range(path, start, end, ncols):
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return parse_rows(mm[start:end], ncols)
+
+def _split(mm, start, end, size):
+    # [start, end) into pieces of about size bytes which end at a newline
+    pieces = []
+    while start < end:
+        stop = min(start + size, end)
+        if stop < end:
+            nl = mm.find(b'\n', stop, end)
+            stop = end if nl < 0 else nl + 1
+        pieces.append((start, stop))
+        start = stop
+    return pieces
+
+
+class FileSource:
+    """ Loads a CSV file into line channels of a stream, then follows it like tail -F.
+
+    The existing content is memory mapped and parsed in big chunks, files
+    larger than 128 MB are parsed by a pool of worker processes. After that
+    every poll reads the lines appended since. A file that got shorter is
+    read again from the start, so is a file replaced by rotation.
+    """
+
+    def __init__(self, path, workers=None, **line_args):
+        self.path = path
+        self.workers = workers
+        self.line_args = dict(drawstyle='steps-pre', lod='minmax')
+        self.line_args.update(line_args)
+
+        self.channels = None
+        self.time_scale = None
+        self._ino = None
+        self._offset = 0
+
+    def _stat(self):
+        try:
+            return os.stat(self.path)
+        except OSError:
+            return None
+
+    def is_update_needed(self, stream):
+        st = self._stat()
+        if st is None:
+            return False
+        return st.st_ino != self._ino or st.st_size != self._offset
+
+    def _read_header(self, f):
+        first = f.readline()
+        fields = [x.strip() for x in first.decode('utf-8', 'replace').split(',')]
+        try:
+            [float(x) for x in fields]
+            return fields, 0
+        except ValueError:
+            return fields, len(first)
+
+    def _create_channels(self, stream, fields, has_header):
+        names = fields[1:] if has_header else ["c{}".format(i) for i in range(1, len(fields))]
+        ax = stream.add_axes("%g")
+        self.channels = [ax.add_line(name, **self.line_args) for name in names]
+
+    def _apply(self, rows):
+        if not len(rows):
+            return
+        tm = rows[:, 0]
+        if self.time_scale is None:
+            self.time_scale = 1e6 if abs(tm[0]) < _SECONDS_LIMIT else 1.0
+        if self.time_scale != 1.0:
+            tm = tm * self.time_scale
+        for i, ch in enumerate(self.channels):
+            ch.update_from_arrays(tm, rows[:, i + 1])
+
+    def _load(self, f, start, size):
+        ncols = len(self.channels) + 1
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = mm.rfind(b'\n', start, size) + 1
+            if end <= start:
+                return start
+
+            pieces = _split(mm, start, end, _CHUNK)
+            if len(pieces) > 1 and end - start >= _PARALLEL_SIZE and self.workers != 0:
+                with ProcessPoolExecutor(self.workers) as pool:
+                    n = len(pieces)
+                    for rows in pool.map(_parse_range, [self.path] * n, [a for a, b in pieces], [b for a, b in pieces], [ncols] * n):
+                        self._apply(rows)
+            else:
+                for a, b in pieces:
+                    self._apply(parse_rows(mm[a:b], ncols))
+        return end
+
+    def update(self, stream):
+        st = self._stat()
+        if st is None:
+            return
+
+        if st.st_ino != self._ino or st.st_size < self._offset:
+            # rotated or truncated, start over
+            self._ino = st.st_ino
+            self._offset = 0
+
+        if st.st_size == self._offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            if self._offset == 0:
+                fields, self._offset = self._read_header(f)
+                if self.channels is None:
+                    self._create_channels(stream, fields, self._offset > 0)
+
+            if self._offset < st.st_size:
+                self._offset = self._load(f, self._offset, st.st_size)
+
+
+__all__ = ('FileSource', 'parse_rows')
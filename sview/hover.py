@@ -0,0 +1,152 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from matplotlib.lines import Line2D
+from matplotlib.transforms import Bbox, TransformedBbox
+
+
+class Hover:
+    """
+    Crosshair and value readout under the mouse, blitted over a copy of the
+    stream region taken while it had no overlay. Motion events only record
+    the position, a timer draws the latest one at most `rate` times a second.
+
+    The copies are dropped on every full draw and, for the streams the
+    Blitter redrew, in redrawn().
+    """
+
+    def __init__(self, win, rate=60.0):
+        self.win = win
+        self.figure = win.figure
+        self.canvas = win.figure.canvas
+
+        self._backgrounds = {}
+        self._lines = {}
+        self._readouts = {}
+
+        # the stream with the overlay on it and the x of the overlay
+        self._stream = None
+        self._x = None
+        self._pending = None
+
+        self.timer = self.canvas.new_timer(interval=max(int(1000.0 / rate), 1))
+        self.timer.add_callback(self._on_timer)
+        self._running = False
+
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def motion(self, stream, x):
+        self._pending = (stream, x)
+        if not self._running:
+            self._running = True
+            self.timer.start()
+
+    def leave(self):
+        self.motion(None, None)
+
+    def _on_timer(self):
+        self.timer.stop()
+        self._running = False
+        if self._pending:
+            stream, x = self._pending
+            self._pending = None
+            self.draw(stream, x)
+
+    def on_draw(self, event):
+        # a full draw has no overlay, copies are taken again when needed
+        self._backgrounds = {}
+        for ax in [ax for ax in self._lines if not ax in self.figure.axes]:
+            del self._lines[ax]
+        for ax in [ax for ax in self._readouts if not ax in self.figure.axes]:
+            del self._readouts[ax]
+
+        if self._stream:
+            stream, self._stream = self._stream, None
+            self.motion(stream, self._x)
+
+    def redrawn(self, streams):
+        """ the Blitter drew these streams anew, without the overlay """
+        for s in streams:
+            self._backgrounds.pop(s, None)
+        if self._stream in streams:
+            stream, self._stream = self._stream, None
+            self.draw(stream, self._x)
+
+    def _bbox(self, stream):
+        return TransformedBbox(Bbox.from_bounds(*stream.region), self.figure.transFigure)
+
+    def _line(self, ax):
+        line = self._lines.get(ax)
+        if line is None:
+            line = self._lines[ax] = Line2D([0, 0], [0, 1], transform=ax.get_xaxis_transform(),
+                                            color='#303030', linewidth=0.8, animated=True)
+            line.set_figure(self.figure)
+            line.axes = ax
+        return line
+
+    def _readout(self, ax):
+        text = self._readouts.get(ax)
+        if text is None:
+            text = self._readouts[ax] = ax.text(0.005, 0.98, '', transform=ax.transAxes, va='top', ha='left',
+                                                size='small', family='monospace', zorder=200, animated=True,
+                                                bbox=dict(facecolor='white', alpha=0.8, edgecolor='#303030'))
+        return text
+
+    def _erase(self, stream):
+        bg = self._backgrounds.get(stream)
+        if bg is not None and stream.shown and stream.region:
+            self.canvas.restore_region(bg)
+            self.canvas.blit(self._bbox(stream))
+
+    def draw(self, stream, x):
+        if self._stream is not None and self._stream is not stream:
+            self._erase(self._stream)
+            self._stream = None
+
+        if stream is None or x is None or not stream.shown or not stream.region or not stream.axes:
+            return
+
+        bbox = self._bbox(stream)
+        bg = self._backgrounds.get(stream)
+        if bg is None:
+            bg = self._backgrounds[stream] = self.canvas.copy_from_bbox(bbox)
+        else:
+            self.canvas.restore_region(bg)
+
+        self._stream = stream
+        self._x = x
+
+        for ax in stream.axes:
+            line = self._line(ax)
+            line.set_xdata([x, x])
+            ax.draw_artist(line)
+
+        ax = stream.axes[0]
+        text = self._readout(ax)
+        text.set_text(stream.readout(x))
+        ax.draw_artist(text)
+
+        self.canvas.blit(bbox)
+
+
+__all__ = ('Hover',)
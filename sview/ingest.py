@@ -0,0 +1,101 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import threading
+import traceback
+
+import numpy as np
+
+class IngestBuffer:
+    """ Samples for one channel, written by any thread and applied on the GUI thread.
+
+    Producers call put() or put_many() and never wait for drawing. The window
+    scheduler drains every buffer once per frame and hands the accumulated
+    samples to channel.update_from_arrays() in as few batches as possible.
+    The lock is only held to append to or to swap out the pending list.
+    """
+
+    def __init__(self, channel, notify=None):
+        self.channel = channel
+        # called, on the producer thread, when samples come to an empty buffer
+        self.notify = notify
+        self._lock = threading.Lock()
+        self._chunks = []
+        self._open = None
+        self._pending = 0
+        # batches the channel rejected, see drain()
+        self.errors = 0
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def put(self, tm, value):
+        with self._lock:
+            if self._open is None:
+                self._open = ([], [])
+                self._chunks.append(self._open)
+            self._open[0].append(tm)
+            self._open[1].append(value)
+            self._pending += 1
+            first = self._pending == 1
+        if first and self.notify:
+            self.notify()
+
+    def put_many(self, tms, values):
+        if len(tms) != len(values):
+            raise Exception("IngestBuffer: got {} timestamps and {} values".format(len(tms), len(values)))
+        # the producer may reuse its arrays once this returns
+        tms = np.array(tms)
+        values = np.array(values)
+        with self._lock:
+            first = self._pending == 0
+            self._chunks.append((tms, values))
+            self._open = None
+            self._pending += len(tms)
+        if first and self.notify:
+            self.notify()
+
+    def drain(self):
+        with self._lock:
+            chunks = self._chunks
+            count = self._pending
+            self._chunks = []
+            self._open = None
+            self._pending = 0
+
+        # a bad batch is reported and dropped, the other ones still go in
+        for tms, values in chunks:
+            try:
+                self.channel.update_from_arrays(tms, values)
+            except Exception as e:
+                self.errors += 1
+                print("Exception: ", e)
+                print("======================================================================================")
+                print(traceback.format_exc())
+                print("======================================================================================")
+
+        return count
+
+
+__all__ = ('IngestBuffer',)
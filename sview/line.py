@@ -22,6 +22,15 @@
 
 from matplotlib.lines import Line2D
 import datetime
+import numpy as np
+
+from .column import as_timestamps, as_values
+from .retention import make_retention
+from .lod import get_method
+from .reorder import split
+from .series import Series
+from .compress import make_compressor, SwingingDoor
+from .cold import ColdStore, SEGMENT
 
 # Set the marker fill style
 # fillstyle: ['full' | 'left' | 'right' | 'bottom' | 'top' | 'none']
@@ -30,19 +39,33 @@ import datetime
 
 _SUPPORTED_ARGS = dict(drawstyle=1, marker=1, markersize=1, linestyle=1, linewidth=1, color=1, alpha=1, fillstyle=1, zorder=1)
 _FLOAT_ARGS = dict(markersize=1, alpha=1, linewidth=1)
+_VALUE_DTYPES = dict(float32=np.float32, float64=np.float64)
+
+def _same(a, b):
+    # missing values are stored as NaN and collapse like any other repeat
+    return a == b or (a != a and b != b)
 
 class Channel:
     def __init__(self, stream, ax, **kw):
         self.stream = stream
         self.dirty = True
-        self.datax = []
-        self.datay = []
+        # samples older than the newest stored one are merged in before the data is read
+        self._data = Series()
         self.axes = ax
 
         self.repeat = False
         self.last_tm = None
 
+        # level of detail: 'minmax' or 'lttb' decimate to the axes width
+        self.lod = None
+        self._view_key = None
+        self._version = 0
+
         self.with_marker = False
+        max_age = max_points = None
+        compress = max_error = None
+        hot_points = None
+        cold_args = {}
 
         if 'marker' in kw:
             self.with_marker = True
@@ -51,6 +74,26 @@ class Channel:
         for k, v in kw.items():
             if k == 'repeat':
                 self.repeat = bool(v)
+            elif k == 'dtype':
+                if not v in _VALUE_DTYPES:
+                    raise Exception("Line: unsupported dtype '{}'".format(v))
+                self._data = Series(_VALUE_DTYPES[v])
+            elif k == 'max_age':
+                max_age = float(v)
+            elif k == 'max_points':
+                max_points = int(v)
+            elif k == 'lod':
+                self.lod = get_method(v) if v else None
+            elif k == 'compress':
+                compress = v or None
+            elif k == 'max_error':
+                max_error = float(v)
+            elif k == 'hot_points':
+                hot_points = int(v)
+            elif k == 'cold_codec':
+                cold_args['codec'] = v
+            elif k == 'cold_cache':
+                cold_args['cache'] = int(v)
             elif not k in _SUPPORTED_ARGS:
                 raise Exception("Line: unknown arg '{}'".format(k))
             elif k in _FLOAT_ARGS:
@@ -58,9 +101,136 @@ class Channel:
             else:
                 args[k] = v
 
-        self.artist = Line2D(self.datax, self.datay, **args)
+        self.retention = make_retention(max_age, max_points)
+        # lossy compression at ingest, replaces the collapsing of repeats
+        self.compressor = make_compressor(compress, max_error)
+        # with hot_points, all but the newest hot_points or so samples go to compressed segments
+        if hot_points is not None and hot_points <= 0:
+            raise Exception("Line: hot_points must be positive")
+        self.hot_points = hot_points
+        self._cold = ColdStore(**cold_args) if hot_points else None
+        self.drawstyle = args.get('drawstyle')
+        if isinstance(self.compressor, SwingingDoor) and self.drawstyle and self.drawstyle.startswith('steps'):
+            # its segments are straight lines, drawn as steps they miss the samples by far more than max_error
+            raise Exception("Line: swinging_door compression needs straight lines, not drawstyle '{}'; use deadband".format(self.drawstyle))
+
+        self._args = args
+        self.artist = None
+        if ax is not None:
+            self.attach(ax)
+
+    def attach(self, ax):
+        self.axes = ax
+        self.artist = Line2D(self.datax, self.datay, **self._args)
         self.axes.add_line(self.artist)
+        self.dirty = True
+        self._view_key = None
+
+    def detach(self):
+        if self.artist:
+            self.artist.remove()
+        self.artist = None
+        self.axes = None
+
+
+    # with tiered storage datax and datay are the hot samples, the older ones are in self._cold
+
+    @property
+    def datax(self):
+        if self._data.late:
+            self._merge_late()
+        return self._data.x.view()
+
+    @property
+    def datay(self):
+        if self._data.late:
+            self._merge_late()
+        return self._data.y.view()
+
+    @property
+    def compression_ratio(self):
+        """ samples received per point stored, None without compression """
+        return self.compressor.ratio if self.compressor else None
 
+    def y_range(self, i, j):
+        if self._data.late:
+            self._merge_late()
+        return self._data.y_range(i, j)
+
+    def _cold_segments(self):
+        return self._cold is not None and len(self._cold) > 0
+
+    def data_bounds(self):
+        ymin, ymax = self.y_range(0, len(self._data))
+        dx = self._data.x
+        x0 = dx[0] if len(dx) else None
+        if self._cold_segments():
+            cmin, cmax = self._cold.bounds()
+            ymin, ymax = np.fmin(ymin, cmin), np.fmax(ymax, cmax)
+            x0 = self._cold.first()
+        if ymin != ymin:
+            return None
+        tail = self._tail()
+        return (x0, ymin, dx[-1] if tail is None else tail, ymax)
+
+    def view_range(self, x0, x1):
+        """ (min, max) of the values in [x0, x1] and of the samples just outside """
+        x = self.datax
+        i, j = self._data.view_slice(x0, x1)
+        if not self._cold_segments() or (len(x) and x0 > x[0]):
+            return self.y_range(i, j)
+
+        # the view reaches into the cold segments, the sample before it too
+        before = self._cold.around(np.nextafter(x0, -np.inf))[0]
+        lo, hi = self._cold.y_range(x0 if before is None else before[0], x1)
+        after = self._cold.around(x1)[1]
+        if after is not None:
+            # the sample after the view is cold too
+            lo, hi = np.fmin(lo, after[1]), np.fmax(hi, after[1])
+            j = 0
+        hlo, hhi = self.y_range(0, j)
+        return (np.fmin(lo, hlo), np.fmax(hi, hhi))
+
+    def sample_at(self, x, before=False):
+        """ value of the sample nearest to x, with before of the last one at or before x; None if there is none """
+        if self._data.late:
+            self._merge_late()
+        left, right = self._data.around(x)
+        if left is None and self._cold_segments():
+            left, after = self._cold.around(x)
+            if after is not None:
+                right = after
+
+        if before or right is None:
+            return None if left is None else left[1]
+        if left is None or right[0] - x < x - left[0]:
+            return right[1]
+        return left[1]
+
+    def window_range(self, width, x0):
+        """ (min, max) of the values from x0 on, for x0 within `width` of the newest sample """
+        x = self.datax
+        y = self.datay
+        lo, hi = self._data.window_range(width, x0)
+        if len(x) and x0 <= x[0]:
+            if self._cold_segments():
+                # and the sample before x0, as below
+                before = self._cold.around(np.nextafter(x0, -np.inf))[0]
+                clo, chi = self._cold.y_range(x0 if before is None else before[0], x[0])
+                lo, hi = np.fmin(lo, clo), np.fmax(hi, chi)
+            return (lo, hi)
+        # the sample before x0 is drawn up to it
+        k = int(np.searchsorted(x, x0)) - 1
+        if k >= 0:
+            lo, hi = np.fmin(lo, y[k]), np.fmax(hi, y[k])
+        return (lo, hi)
+
+    def _tail(self):
+        # the time up to which the last value is repeated, if any
+        last_tm = self.stream.last_tm
+        if self.repeat and len(self._data) and last_tm is not None and self._data.x[-1] != last_tm:
+            return last_tm
+        return None
 
     def prepare_artists(self):
         stream = self.stream
@@ -68,44 +238,218 @@ class Channel:
         if not self.dirty and self.last_tm == stream.last_tm:
             return False
 
+        if self._data.late:
+            self._merge_late()
+
         self.last_tm = stream.last_tm
 
-        if self.repeat and self.datax[-1] != stream.last_tm:
-            self.artist.set_data(self.datax + [stream.last_tm], self.datay + [self.datay[-1]])
+        tail = self._tail()
+        if self.lod or self._cold_segments():
+            # the view may still change this frame, Stream calls update_view() once it is final
+            self._view_key = None
+        elif tail is not None:
+            dy = self._data.y
+            self.artist.set_data(self._data.x.with_tail(tail), dy.with_tail(dy[-1]))
         else:
             self.artist.set_data(self.datax, self.datay)
 
         self.dirty = False
         return True
 
+    def update_view(self):
+        cold = self._cold_segments()
+        if not self.lod and not cold:
+            return False
 
-    def destroy(self):
-        if self.artist:
-            self.axes.lines.remove(self.artist)
+        x0, x1 = self.axes.get_xlim()
+        columns = max(int(self.axes.bbox.width), 1)
 
-        self.artist = None
+        key = (x0, x1, columns, self._version, self.last_tm)
+        if key == self._view_key:
+            return False
+        self._view_key = key
+
+        x = self.datax
+        y = self.datay
+        tail = self._tail()
+        if cold and (not len(x) or x0 < x[0]):
+            # history: what the cold segments give for the view, then the hot samples up to its right edge
+            j = min(int(np.searchsorted(x, x1, 'right')) + 1, len(x))
+            if j < len(x):
+                tail = None
+            cx, cy = self._cold.view(x0, x1, columns)
+            x = np.concatenate((cx, x[:j]))
+            y = np.concatenate((cy, y[:j]))
+
+        if self.lod and len(x) > 2 * columns:
+            idx = self.lod(x, y, x0, x1, columns, self.drawstyle)
+            x = x[idx]
+            y = y[idx]
+
+        if tail is not None:
+            x = np.append(x, tail)
+            y = np.append(y, y[-1])
+
+        self.artist.set_data(x, y)
+        return True
+
+
+    def destroy(self):
+        self.detach()
         self.stream = None
 
     def update_from_str(self, tm, line):
         self.dirty = True
+        self._version += 1
 
         if line is not None:
-            new_value = float(line)
+            new_value = self._data.y.dtype.type(float(line))
         else:
-            new_value = line
+            new_value = np.nan
 
         if isinstance(tm, datetime.datetime):
             tm = tm.timestamp() * 1e6
 
-        dx = self.datax
-        dy = self.datay
+        recorder = self.stream.win.recorder
+        if recorder:
+            recorder.add(self, tm, new_value)
+
+        prof = self.stream.win.profiler
+        if prof.enabled:
+            prof.points += 1
 
-        if self.with_marker == False and len(dx) > 1 and dy[-1] == dy[-2] and dy[-1] == new_value:
+        data = self._data
+        dx = data.x
+        dy = data.y
+
+        if len(dx) and tm < dx[-1]:
+            if data.add_late(tm, new_value):
+                self._merge_late()
+        elif self.compressor:
+            tm, new_value, replace = self.compressor.add(tm, new_value)
+            if replace and dy[-1] == new_value:
+                dx[-1] = tm
+            else:
+                if replace:
+                    self._drop_last()
+                data.append(tm, new_value)
+                self._evict()
+        elif self.with_marker == False and len(dx) > 1 and _same(dy[-1], dy[-2]) and _same(dy[-1], new_value):
             dx[-1] = tm
         else:
-            dx.append(tm)
-            dy.append(new_value)
+            data.append(tm, new_value)
+            self._evict()
+
+        self.stream.invalidate(self)
+
+    def update_from_arrays(self, tms, values):
+        x = as_timestamps(tms)
+        y = as_values(values, self._data.y.dtype)
+        if len(x) != len(y):
+            raise Exception("Line: got {} timestamps and {} values".format(len(x), len(y)))
+        if not len(x):
+            return
+
+        recorder = self.stream.win.recorder
+        if recorder:
+            recorder.add_many(self, x, y)
+
+        prof = self.stream.win.profiler
+        if prof.enabled:
+            prof.points += len(x)
+
+        self.dirty = True
+        self._version += 1
+
+        order, k = split(x, self._data.last())
+        if order is not None:
+            x, y = x[order], y[order]
+        if k:
+            if self._data.add_late_many(x[:k], y[:k]):
+                self._merge_late()
+            x, y = x[k:], y[k:]
+            if not len(x):
+                self.stream.invalidate(self)
+                return
+
+        if self.compressor:
+            x, y, replace = self.compressor.add_many(x, y)
+            if replace:
+                self._drop_last()
+        elif self.with_marker == False:
+            x, y = self._collapse(x, y)
+
+        self._data.extend(x, y)
+        self._evict()
+
+        self.stream.invalidate(self)
+
+    def _collapse(self, x, y):
+        # the same rule as in update_from_str: of a run of equal values only
+        # the first and the last samples are kept
+        dy = self._data.y
+        n_old = min(len(dy), 2)
+        full = np.concatenate((dy.view()[len(dy) - n_old:], y))
+
+        nan = np.isnan(full)
+        eq = (full[1:] == full[:-1]) | (nan[1:] & nan[:-1])
+
+        keep = np.ones(len(full), dtype=bool)
+        keep[1:-1] = ~(eq[:-1] & eq[1:])
 
-        self.stream.invalidate()
+        new_keep = keep[n_old:]
+        if n_old == 2 and not keep[1]:
+            # the stored last sample is inside a run, it moves to the first kept new one
+            k = int(np.argmax(new_keep))
+            self._data.x[-1] = x[k]
+            new_keep[k] = False
+
+        return x[new_keep], y[new_keep]
+
+    def _drop_last(self):
+        self._data.truncate(len(self._data) - 1)
+
+    def _merge_late(self):
+        if self._data.merge_late():
+            self._version += 1
+            self.dirty = True
+            self._evict()
+
+    def _evict(self):
+        retention = self.retention or self.stream.retention
+        if retention and self._cold_segments():
+            self._evict_cold(retention)
+        if retention and not self._cold_segments():
+            k = retention.excess(self._data.x.view())
+            if k:
+                self._data.drop_front(k)
+
+        cold = self._cold
+        if cold is not None and len(self._data) >= self.hot_points + SEGMENT:
+            # the oldest samples go cold, whole segments of them
+            n = (len(self._data) - self.hot_points) // SEGMENT * SEGMENT
+            x = self._data.x.view()
+            y = self._data.y.view()
+            for i in range(0, n, SEGMENT):
+                cold.add(x[i:i + SEGMENT], y[i:i + SEGMENT])
+            self._data.drop_front(n)
+
+    def _evict_cold(self, retention):
+        # whole segments only
+        cold = self._cold
+        newest = self._data.x[-1]
+        total = len(cold) + len(self._data)
+        n = 0
+        for seg in cold.segments:
+            if retention.max_age and seg.t1 < newest - retention.max_age * 1e6:
+                pass
+            elif retention.max_points and total - seg.count >= retention.max_points:
+                pass
+            else:
+                break
+            total -= seg.count
+            n += 1
+        if n:
+            cold.drop_front(n)
 
 
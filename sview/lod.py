@@ -0,0 +1,150 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import numpy as np
+
+# Level-of-detail reduction of sorted (x, y) series for drawing. Samples in the
+# view [x0, x1] are split into one bucket per pixel column and each bucket is
+# reduced to a couple of representative samples, so the amount of data given
+# to matplotlib depends on the axes width instead of the series length.
+#
+# Both functions return sorted indices into x. The samples just outside the
+# view and the first and the last sample of the series are always kept, so
+# lines run off the edges of the axes and the data limits stay the same.
+
+_DRAWSTYLE_FIRST = {'steps': 1, 'steps-pre': 1, 'steps-mid': 1}
+_DRAWSTYLE_LAST = {'steps-post': 1, 'steps-mid': 1}
+
+
+def _buckets(x, x0, x1, columns):
+    i0 = int(np.searchsorted(x, x0, 'left'))
+    i1 = int(np.searchsorted(x, x1, 'right'))
+
+    edges = np.linspace(x0, x1, columns + 1)[:-1]
+    starts = np.unique(np.searchsorted(x[i0:i1], edges, 'left'))
+    starts = starts[starts < i1 - i0]
+    return i0, i1, starts
+
+
+def _first_match(mask, starts, ends, offset):
+    # first index of each bucket where mask is set, -1 if there is none
+    pos = np.flatnonzero(mask)
+    if len(pos) == 0:
+        return np.full(len(starts), -1)
+    j = np.searchsorted(pos, starts)
+    found = pos[np.minimum(j, len(pos) - 1)]
+    return np.where((j < len(pos)) & (found < ends), found + offset, -1)
+
+
+def _edges(n, i0, i1):
+    return np.array([0, i0 - 1, i1, n - 1])
+
+
+def _finish(parts, n):
+    idx = np.concatenate(parts)
+    idx = idx[(idx >= 0) & (idx < n)]
+    return np.unique(idx)
+
+
+def minmax_indices(x, y, x0, x1, columns, drawstyle=None):
+    n = len(x)
+    i0, i1, starts = _buckets(x, x0, x1, columns)
+    if len(starts) == 0:
+        return _finish([_edges(n, i0, i1)], n)
+
+    yv = np.asarray(y[i0:i1], dtype=np.float64)
+    ends = np.append(starts[1:], len(yv))
+    counts = ends - starts
+
+    ymin = np.fmin.reduceat(yv, starts)
+    ymax = np.fmax.reduceat(yv, starts)
+
+    parts = [_edges(n, i0, i1),
+             _first_match(yv == np.repeat(ymin, counts), starts, ends, i0),
+             _first_match(yv == np.repeat(ymax, counts), starts, ends, i0),
+             _first_match(np.isnan(yv), starts, ends, i0)]
+
+    if drawstyle in _DRAWSTYLE_FIRST:
+        parts.append(starts + i0)
+    if drawstyle in _DRAWSTYLE_LAST:
+        parts.append(ends - 1 + i0)
+
+    return _finish(parts, n)
+
+
+def lttb_indices(x, y, x0, x1, columns, drawstyle=None):
+    """ Largest-Triangle-Three-Buckets over pixel-column buckets """
+    n = len(x)
+    i0, i1, starts = _buckets(x, x0, x1, columns)
+    if len(starts) < 3:
+        return minmax_indices(x, y, x0, x1, columns, drawstyle)
+
+    xv = np.asarray(x[i0:i1], dtype=np.float64)
+    yv = np.asarray(y[i0:i1], dtype=np.float64)
+    ends = np.append(starts[1:], len(yv))
+
+    valid = ~np.isnan(yv)
+    sums_x = np.add.reduceat(np.where(valid, xv, 0.0), starts)
+    sums_y = np.add.reduceat(np.where(valid, yv, 0.0), starts)
+    nvalid = np.add.reduceat(valid.astype(np.int64), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_x = sums_x / nvalid
+        avg_y = sums_y / nvalid
+
+    picked = np.empty(len(starts), dtype=np.int64)
+    picked[0] = starts[0]
+    a = starts[0]
+    for b in range(1, len(starts)):
+        s, e = starts[b], ends[b]
+        if b + 1 < len(starts) and nvalid[b + 1]:
+            cx, cy = avg_x[b + 1], avg_y[b + 1]
+        else:
+            cx, cy = xv[e - 1], yv[e - 1]
+
+        if yv[a] != yv[a] or cy != cy:
+            # gap on one side, any point of the bucket is as good as the other
+            picked[b] = s
+        else:
+            area = np.abs((xv[a] - cx) * (yv[s:e] - yv[a]) - (xv[a] - xv[s:e]) * (cy - yv[a]))
+            area[np.isnan(area)] = -1.0
+            picked[b] = s + int(np.argmax(area))
+        a = picked[b]
+
+    parts = [_edges(n, i0, i1), picked + i0, _first_match(~valid, starts, ends, i0)]
+    if drawstyle in _DRAWSTYLE_FIRST:
+        parts.append(starts + i0)
+    if drawstyle in _DRAWSTYLE_LAST:
+        parts.append(ends - 1 + i0)
+
+    return _finish(parts, n)
+
+
+_METHODS = dict(minmax=minmax_indices, lttb=lttb_indices)
+
+def get_method(name):
+    if not name in _METHODS:
+        raise Exception("LOD: unknown method '{}'".format(name))
+    return _METHODS[name]
+
+
+__all__ = ('minmax_indices', 'lttb_indices', 'get_method')
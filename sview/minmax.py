@@ -0,0 +1,264 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import numpy as np
+
+from .column import Column
+
+_SHIFT = 6
+_BLOCK = 1 << _SHIFT
+
+def _reduce(values):
+    if len(values) == 0:
+        return (np.nan, np.nan)
+    return (np.fmin.reduce(values), np.fmax.reduce(values))
+
+def _combine(a, b):
+    return (np.fmin(a[0], b[0]), np.fmax(a[1], b[1]))
+
+class MinMaxIndex:
+    """ Hierarchical min/max summary of a column, for range queries in O(log n).
+
+    Level L holds the min and max of consecutive blocks of 64**(L+1) samples.
+    Blocks are numbered by absolute sample position (counted from the first
+    sample ever appended), so dropping samples from the front only discards
+    whole blocks that are no longer needed. NaN samples are ignored.
+    """
+
+    def __init__(self):
+        self._base = 0
+        self._count = 0
+        self._mins = []
+        self._maxs = []
+        self._first = []
+
+    def __len__(self):
+        return self._count - self._base
+
+    @property
+    def appended(self):
+        """ number of samples appended ever, the absolute position of the end """
+        return self._count
+
+    def clear(self):
+        self.__init__()
+
+    def _level(self, L, k):
+        while L >= len(self._mins):
+            self._mins.append(Column(np.float64))
+            self._maxs.append(Column(np.float64))
+            self._first.append(k)
+        return self._mins[L], self._maxs[L]
+
+    def append(self, v):
+        p = self._count
+        self._count = p + 1
+
+        L = 0
+        while True:
+            k = p >> (_SHIFT * (L + 1))
+            mins, maxs = self._level(L, k)
+            i = k - self._first[L]
+            if i == len(mins):
+                mins.append(v)
+                maxs.append(v)
+            elif v == v:
+                if not v >= mins[i]:
+                    mins[i] = v
+                if not v <= maxs[i]:
+                    maxs[i] = v
+            if k == 0:
+                break
+            L += 1
+
+    def extend(self, values):
+        n = len(values)
+        if n == 0:
+            return
+
+        vmin = vmax = np.asarray(values, dtype=np.float64)
+        start = self._count
+        self._count += n
+
+        L = 0
+        while True:
+            end = start + len(vmin)
+            k0 = start >> _SHIFT
+            k1 = (end - 1) >> _SHIFT
+
+            offsets = (np.arange(k0, k1 + 1) << _SHIFT) - start
+            offsets[0] = 0
+            bmin = np.fmin.reduceat(vmin, offsets)
+            bmax = np.fmax.reduceat(vmax, offsets)
+
+            mins, maxs = self._level(L, k0)
+            i = k0 - self._first[L]
+            if i < len(mins):
+                bmin[0] = np.fmin(bmin[0], mins[i])
+                bmax[0] = np.fmax(bmax[0], maxs[i])
+                mins.truncate(i)
+                maxs.truncate(i)
+            mins.extend(bmin)
+            maxs.extend(bmax)
+
+            if k1 == 0:
+                break
+
+            vmin, vmax, start = bmin, bmax, k0
+            L += 1
+
+    def drop_front(self, n):
+        self._base = min(self._base + n, self._count)
+        for L in range(len(self._mins)):
+            k = self._base >> (_SHIFT * (L + 1))
+            if k > self._first[L]:
+                self._mins[L].drop_front(k - self._first[L])
+                self._maxs[L].drop_front(k - self._first[L])
+                self._first[L] = k
+
+    def truncate(self, values, n):
+        """ keeps the first n samples, values is the indexed column """
+        p = self._base + max(min(n, len(self)), 0)
+        self._count = p
+        for L in range(len(self._mins)):
+            mins, maxs = self._mins[L], self._maxs[L]
+            first = self._first[L]
+            k = p >> (_SHIFT * (L + 1))
+            mins.truncate(max(k - first, 0))
+            maxs.truncate(max(k - first, 0))
+            if k < first:
+                continue
+
+            # the block p falls into is summarized again from what is left below it
+            if L == 0:
+                lo = max(k << _SHIFT, self._base)
+                if lo >= p:
+                    continue
+                r = _reduce(np.asarray(values[lo - self._base:p - self._base], dtype=np.float64))
+            else:
+                below = self._first[L - 1]
+                lo = max(k << _SHIFT, below) - below
+                hi = len(self._mins[L - 1])
+                if lo >= hi:
+                    continue
+                r = (np.fmin.reduce(self._mins[L - 1].view()[lo:hi]), np.fmax.reduce(self._maxs[L - 1].view()[lo:hi]))
+            mins.append(r[0])
+            maxs.append(r[1])
+
+    def rebuild(self, values):
+        self.clear()
+        self.extend(values)
+
+    def _direct(self, values, L, lo, hi):
+        if lo >= hi:
+            return (np.nan, np.nan)
+        if L < 0:
+            return _reduce(np.asarray(values[lo - self._base:hi - self._base], dtype=np.float64))
+        first = self._first[L]
+        return (np.fmin.reduce(self._mins[L].view()[lo - first:hi - first]),
+                np.fmax.reduce(self._maxs[L].view()[lo - first:hi - first]))
+
+    def _range(self, values, L, lo, hi):
+        if hi - lo <= 2 * _BLOCK or L + 1 >= len(self._mins):
+            return self._direct(values, L, lo, hi)
+
+        blo = -(-lo >> _SHIFT)
+        bhi = hi >> _SHIFT
+        r = self._range(values, L + 1, blo, bhi)
+        r = _combine(r, self._direct(values, L, lo, blo << _SHIFT))
+        return _combine(r, self._direct(values, L, bhi << _SHIFT, hi))
+
+    def query(self, values, i, j):
+        """ (min, max) of values[i:j], values is the indexed column; NaN if there are none """
+        i = max(i, 0)
+        j = min(j, self._count - self._base)
+        if i >= j:
+            return (np.nan, np.nan)
+        return self._range(values, -1, i + self._base, j + self._base)
+
+
+class SlidingMinMax:
+    """ Min and max of the samples within `width` of the newest one.
+
+    Two monotonic deques of (x, y) candidates kept in Columns: a sample stays
+    while no later sample is lower (higher), so the front of each is the
+    answer. x must not decrease; NaN values are ignored. extend() is
+    vectorized: the candidates of a batch are its suffix minima (maxima).
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self._min = (Column(np.float64), Column(np.float64))
+        self._max = (Column(np.float64), Column(np.float64))
+
+    def clear(self):
+        self.__init__(self.width)
+
+    def extend(self, x, y):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        valid = y == y
+        if not valid.all():
+            x = x[valid]
+            y = y[valid]
+        if not len(x):
+            return
+
+        self._push(self._max, x, y, 1.0)
+        self._push(self._min, x, y, -1.0)
+        self.expire(x[-1] - self.width)
+
+    def _push(self, deque, x, y, sign):
+        # on z = sign*y the deque is strictly decreasing, a maximum deque
+        z = y * sign
+        later = np.maximum.accumulate(z[::-1])[::-1]
+        keep = np.empty(len(z), dtype=bool)
+        keep[:-1] = z[:-1] > later[1:]
+        keep[-1] = True
+
+        dx, dy = deque
+        old = dy.view()[::-1] * sign
+        n = len(old) - int(np.searchsorted(old, later[0], side='right'))
+        dx.truncate(n)
+        dy.truncate(n)
+        dx.extend(x[keep])
+        dy.extend(y[keep])
+
+    def expire(self, x0):
+        """ forget the samples before x0 """
+        for dx, dy in (self._min, self._max):
+            n = int(np.searchsorted(dx.view(), x0, side='left'))
+            if n:
+                dx.drop_front(n)
+                dy.drop_front(n)
+
+    def query(self, x0=None):
+        """ (min, max) of the samples from x0 on, NaN if there are none """
+        r = []
+        for dx, dy in (self._min, self._max):
+            i = int(np.searchsorted(dx.view(), x0, side='left')) if x0 is not None else 0
+            r.append(dy[i] if i < len(dy) else np.nan)
+        return tuple(r)
+
+
+__all__ = ('MinMaxIndex', 'SlidingMinMax')
@@ -0,0 +1,169 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import time
+import numpy as np
+
+from collections import deque
+
+# bucket edges of Histogram.buckets(), milliseconds
+_EDGES_MS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0)
+
+
+class Histogram:
+    """ The last `size` durations of one stage, in seconds """
+
+    def __init__(self, size=256):
+        self._data = np.zeros(size)
+        self.count = 0
+
+    def add(self, seconds):
+        self._data[self.count % len(self._data)] = seconds
+        self.count += 1
+
+    def values(self):
+        return self._data[:min(self.count, len(self._data))]
+
+    def buckets(self):
+        """ counts of the recent durations between the _EDGES_MS edges, the last bucket is open """
+        edges = np.array((0.0,) + _EDGES_MS + (np.inf,)) / 1000.0
+        return np.histogram(self.values(), edges)[0].tolist()
+
+    def summary(self):
+        v = self.values() * 1000.0
+        if not len(v):
+            return dict(count=0)
+        p50, p90, p99 = np.percentile(v, (50, 90, 99))
+        return dict(count=self.count, mean=float(v.mean()), p50=float(p50), p90=float(p90),
+                    p99=float(p99), max=float(v.max()), buckets=self.buckets())
+
+
+class Profiler:
+    """
+    Frame timings of a window: the time of every stage (prepare, scale, ticks,
+    draw...) is summed over a frame and kept per window, stream and channel
+    in rolling histograms. Keys are tuples, ('draw',) for the window,
+    (stream, 'scale') for a stream, (stream, channel, 'view') for a channel.
+
+    Disabled by default, the hooks only check `enabled` then.
+    """
+
+    def __init__(self, size=256):
+        self.enabled = False
+        self.size = size
+        self.reset()
+
+    def reset(self):
+        self.stages = {}
+        self.frames = 0
+        self.dropped = 0
+        self.points = 0
+        self._frame = {}
+        self._rate = deque(maxlen=64)
+
+    def enable(self, enabled=True):
+        if enabled and not self.enabled:
+            self._frame = {}
+        self.enabled = enabled
+
+    def add(self, key, seconds):
+        self._frame[key] = self._frame.get(key, 0.0) + seconds
+
+    def call(self, key, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.add(key, time.perf_counter() - start)
+
+    def end_frame(self, seconds, budget):
+        """ a frame took `seconds`, those beyond `budget` are counted as dropped frames """
+        self.add(('frame',), seconds)
+        for key, spent in self._frame.items():
+            hist = self.stages.get(key)
+            if hist is None:
+                hist = self.stages[key] = Histogram(self.size)
+            hist.add(spent)
+        self._frame = {}
+
+        self.frames += 1
+        if budget and seconds > budget:
+            self.dropped += int(seconds // budget)
+        self._rate.append((time.perf_counter(), self.points))
+
+    def points_per_second(self):
+        if len(self._rate) < 2:
+            return 0.0
+        (t0, n0), (t1, n1) = self._rate[0], self._rate[-1]
+        return (n1 - n0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def stats(self):
+        """ everything as a dict of plain values, the stages keyed by '/'.join(key), times in ms """
+        return dict(frames=self.frames, dropped=self.dropped, points=self.points,
+                    points_per_second=self.points_per_second(),
+                    stages={'/'.join(k): h.summary() for k, h in self.stages.items()})
+
+    def report(self, limit=16):
+        """ a few text lines, the slowest stages first """
+        lines = ["frames {}  dropped {}  points/s {:.0f}".format(self.frames, self.dropped, self.points_per_second())]
+        rows = [('/'.join(k), h.summary()) for k, h in self.stages.items()]
+        rows.sort(key=lambda r: -r[1].get('mean', 0.0))
+        for name, s in rows[:limit]:
+            lines.append("{:32.32} {:8.2f} {:8.2f} {:8.2f}".format(name, s['mean'], s['p90'], s['max']))
+        if rows:
+            lines.insert(1, "{:32} {:>8} {:>8} {:>8}".format("stage, ms", "mean", "p90", "max"))
+        return "\n".join(lines)
+
+
+class Hud:
+    """ Profiler.report() drawn in the corner of the window """
+
+    def __init__(self, win, interval=0.5):
+        self.win = win
+        self.interval = interval
+        self._last = 0.0
+        self.text = win.figure.text(0.005, 0.995, '', va='top', ha='left', family='monospace',
+                                    size='x-small', zorder=1000, visible=False,
+                                    bbox=dict(facecolor='white', alpha=0.8, edgecolor='#303030'))
+
+    @property
+    def visible(self):
+        return self.text.get_visible()
+
+    def show(self, visible=True):
+        self.text.set_visible(visible)
+        self._last = 0.0
+        if visible:
+            self.update()
+
+    def update(self):
+        """ refresh the text at most every `interval` seconds, True if it changed """
+        now = time.perf_counter()
+        if not self.visible or now - self._last < self.interval:
+            return False
+        self._last = now
+        self.text.set_text(self.win.profiler.report())
+        return True
+
+
+__all__ = ('Histogram', 'Profiler', 'Hud')
@@ -0,0 +1,272 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import mmap
+import struct
+import time
+
+import numpy as np
+
+from .column  import as_values
+from .line    import Channel as LineChannel
+from .scatter import Channel as ScatterChannel
+from .stream  import AxesProxy, stream_key
+
+# A recording is a file of chunks, each holds a run of samples of one channel
+# as columns: float64 timestamps, then float64 values or, for text channels,
+# int64 offsets into a UTF-8 blob. Everything is 8-byte aligned, so replay can
+# use the columns straight from the memory mapped file.
+
+_MAGIC = b'SVIEWREC'
+_CHUNK = struct.Struct('<4sBxHHxxQ')
+_CHUNK_TAG = b'CHNK'
+
+KIND_LINE, KIND_SCATTER, KIND_TEXT = 0, 1, 2
+
+def _pad(n):
+    return (8 - n % 8) % 8
+
+def _kind(channel):
+    if isinstance(channel, LineChannel):
+        return KIND_LINE
+    if isinstance(channel, ScatterChannel):
+        return KIND_SCATTER
+    return KIND_TEXT
+
+class Recorder:
+    """ Writes every sample fed into the channels of a window to a file """
+
+    def __init__(self, path, flush_size=65536, flush_interval=1.0):
+        self.path = path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.file = open(path, 'wb')
+        self.file.write(_MAGIC)
+        self._pending = {}
+        self._count = 0
+        self._last_flush = time.monotonic()
+
+    def _entry(self, channel):
+        e = self._pending.get(id(channel))
+        if e is None:
+            e = self._pending[id(channel)] = (channel, [])
+        return e[1]
+
+    def add(self, channel, tm, value):
+        pieces = self._entry(channel)
+        if not pieces or isinstance(pieces[-1][0], np.ndarray):
+            pieces.append(([], []))
+        pieces[-1][0].append(tm)
+        pieces[-1][1].append(value)
+        self._count += 1
+        self._maybe_flush()
+
+    def add_many(self, channel, tms, values):
+        if _kind(channel) == KIND_TEXT:
+            values = list(values)
+        else:
+            values = np.array(as_values(values))
+        self._entry(channel).append((np.array(tms, dtype=np.float64), values))
+        self._count += len(tms)
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if self._count >= self.flush_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _write_chunk(self, channel, kind, tms, values):
+        skey = stream_key(channel.stream).encode('utf-8')
+        name = channel.name.encode('utf-8')
+        names = skey + name
+        self.file.write(_CHUNK.pack(_CHUNK_TAG, kind, len(skey), len(name), len(tms)))
+        self.file.write(names + b'\0' * _pad(len(names)))
+        self.file.write(tms.tobytes())
+
+        if kind == KIND_TEXT:
+            blobs = [str(v).encode('utf-8') for v in values]
+            offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+            np.cumsum([len(b) for b in blobs], out=offsets[1:])
+            blob = b''.join(blobs)
+            self.file.write(offsets.tobytes())
+            self.file.write(blob + b'\0' * _pad(len(blob)))
+        else:
+            self.file.write(as_values(values).tobytes())
+
+    def flush(self):
+        for channel, pieces in self._pending.values():
+            kind = _kind(channel)
+            tms = np.concatenate([np.asarray(t, dtype=np.float64) for t, v in pieces])
+            if kind == KIND_TEXT:
+                values = [x for t, v in pieces for x in v]
+            else:
+                values = np.concatenate([as_values(v) for t, v in pieces])
+            self._write_chunk(channel, kind, tms, values)
+
+        self._pending = {}
+        self._count = 0
+        self._last_flush = time.monotonic()
+        self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+
+class _Track:
+    # the chunks of one recorded channel
+    def __init__(self, skey, name, kind):
+        self.skey = skey
+        self.name = name
+        self.kind = kind
+        self.chunks = []
+        self.channel = None
+        self.chunk = 0
+        self.pos = 0
+
+
+class Player:
+    """ Replays a recording into a window.
+
+    With speed=None everything is loaded at once, the columns go from the
+    memory mapped file directly into channel storage. Otherwise samples are
+    released as time goes by, speed times faster than they were recorded.
+    Streams and channels are matched by stream title (or position) and
+    channel name and created when the window doesn't have them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(_MAGIC)] != _MAGIC:
+            raise Exception("Player: {} is not a recording".format(path))
+
+        self.tracks = []
+        self._scan()
+
+        starts = [t.chunks[0][0][0] for t in self.tracks if len(t.chunks[0][0])]
+        self.first_tm = min(starts) if starts else None
+        self.win = None
+
+    def _scan(self):
+        mm = self.mm
+        tracks = {}
+        pos = len(_MAGIC)
+        while pos + _CHUNK.size <= len(mm):
+            tag, kind, lkey, lname, n = _CHUNK.unpack_from(mm, pos)
+            if tag != _CHUNK_TAG:
+                raise Exception("Player: {} is damaged at offset {}".format(self.path, pos))
+            pos += _CHUNK.size
+
+            skey = mm[pos:pos + lkey].decode('utf-8')
+            name = mm[pos + lkey:pos + lkey + lname].decode('utf-8')
+            pos += lkey + lname + _pad(lkey + lname)
+
+            tms = np.frombuffer(mm, dtype=np.float64, count=n, offset=pos)
+            pos += n * 8
+
+            if kind == KIND_TEXT:
+                offsets = np.frombuffer(mm, dtype=np.int64, count=n + 1, offset=pos)
+                pos += (n + 1) * 8
+                values = (pos, offsets)
+                pos += int(offsets[-1]) + _pad(int(offsets[-1]))
+            else:
+                values = np.frombuffer(mm, dtype=np.float64, count=n, offset=pos)
+                pos += n * 8
+
+            if not (skey, name) in tracks:
+                tracks[(skey, name)] = _Track(skey, name, kind)
+                self.tracks.append(tracks[(skey, name)])
+            tracks[(skey, name)].chunks.append((tms, values))
+
+    def _values(self, track, values, i, j):
+        if track.kind != KIND_TEXT:
+            return values[i:j]
+        base, offsets = values
+        return [self.mm[base + offsets[k]:base + offsets[k + 1]].decode('utf-8') for k in range(i, j)]
+
+    def _resolve(self, win, track):
+        stream = None
+        for s in win.streams:
+            if stream_key(s) == track.skey:
+                stream = s
+                break
+        if stream is None:
+            stream = win.create_stream(None if track.skey.startswith('#') else track.skey)
+
+        channel = stream.channel_names.get(track.name)
+        if channel:
+            return channel
+
+        proxy = AxesProxy(stream, 0) if stream.axes_specs else stream.add_axes("%g")
+        if track.kind == KIND_LINE:
+            return proxy.add_line(track.name)
+        if track.kind == KIND_SCATTER:
+            return proxy.add_scatter(track.name)
+        return proxy.add_text_channel(track.name)
+
+    def play(self, win, speed=None):
+        self.win = win
+        for t in self.tracks:
+            t.channel = self._resolve(win, t)
+            t.chunk = t.pos = 0
+
+        if speed is None:
+            for t in self.tracks:
+                for tms, values in t.chunks:
+                    t.channel.update_from_arrays(tms, self._values(t, values, 0, len(tms)))
+            return
+
+        self.speed = float(speed)
+        self.started = time.monotonic()
+        win.scheduler.add(self, win)
+
+    def now(self):
+        return self.first_tm + (time.monotonic() - self.started) * self.speed * 1e6
+
+    def is_update_needed(self, win):
+        return any(t.chunk < len(t.chunks) for t in self.tracks)
+
+    def update(self, win):
+        now = self.now()
+        for t in self.tracks:
+            while t.chunk < len(t.chunks):
+                tms, values = t.chunks[t.chunk]
+                j = int(np.searchsorted(tms, now, 'right'))
+                if j > t.pos:
+                    t.channel.update_from_arrays(tms[t.pos:j], self._values(t, values, t.pos, j))
+                    t.pos = j
+                if t.pos < len(tms):
+                    break
+                t.chunk += 1
+                t.pos = 0
+
+    def close(self):
+        self.tracks = []
+        self.mm.close()
+        self.file.close()
+
+
+__all__ = ('Recorder', 'Player')
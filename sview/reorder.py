@@ -0,0 +1,78 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import numpy as np
+
+# late samples are merged into the storage when this many are waiting, or before the data is read
+BATCH = 4096
+
+class Late:
+    """ Samples older than the newest stored one, kept aside and merged into the
+    sorted storage in one batch: moving the stored samples after the oldest late
+    one costs the same for one sample as for a whole batch.
+    """
+
+    def __init__(self):
+        self._x = []
+        self._y = []
+        self._chunks = []
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, x, y):
+        self._x.append(x)
+        self._y.append(y)
+        self._count += 1
+        return self._count >= BATCH
+
+    def add_many(self, x, y):
+        self._chunks.append((x, y))
+        self._count += len(x)
+        return self._count >= BATCH
+
+    def take(self):
+        """ the waiting samples as (x, y) arrays sorted by time, arrival order kept for equal times """
+        xs = [np.asarray(self._x, dtype=np.float64)] + [c[0] for c in self._chunks]
+        ys = [np.asarray(self._y, dtype=np.float64)] + [np.asarray(c[1], dtype=np.float64) for c in self._chunks]
+        self.__init__()
+
+        x = np.concatenate(xs)
+        y = np.concatenate(ys)
+        order = np.argsort(x, kind='stable')
+        return x[order], y[order]
+
+
+def split(x, last):
+    """ x of a batch as (order, k): order sorts x (None if it is sorted already) and
+        the samples from k on are not older than `last`, the newest stored time """
+    order = None
+    if len(x) > 1 and not (x[1:] >= x[:-1]).all():
+        order = np.argsort(x, kind='stable')
+        x = x[order]
+    k = int(np.searchsorted(x, last, side='left')) if last is not None else 0
+    return order, k
+
+
+__all__ = ('Late', 'split', 'BATCH')
@@ -0,0 +1,72 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import bisect
+
+# samples are evicted in bulk: only once the overflow reaches this fraction of
+# the limit, so the check on every append is O(1) and the copying amortized
+_SLACK = 0.125
+
+class Retention:
+    """ How much history a channel keeps: max_age in seconds (the same unit
+    as Stream.time_window), max_points in samples, or both.
+    """
+
+    def __init__(self, max_age=None, max_points=None):
+        if max_age is not None and max_age <= 0:
+            raise Exception("Retention: max_age must be positive")
+        if max_points is not None and max_points <= 0:
+            raise Exception("Retention: max_points must be positive")
+
+        self.max_age = max_age
+        self.max_points = max_points
+
+    def __bool__(self):
+        return bool(self.max_age or self.max_points)
+
+    def excess(self, datax):
+        """ number of leading samples of sorted datax that should be dropped now """
+        n = len(datax)
+        if n == 0:
+            return 0
+
+        k = 0
+        if self.max_points and n > self.max_points + max(int(self.max_points * _SLACK), 1):
+            k = n - self.max_points
+
+        if self.max_age:
+            max_age = self.max_age * 1e6
+            limit = datax[-1] - max_age
+            if datax[k] < limit - max_age * _SLACK:
+                k = max(k, bisect.bisect_left(datax, limit))
+
+        return k
+
+
+def make_retention(max_age=None, max_points=None):
+    if max_age is None and max_points is None:
+        return None
+    return Retention(max_age, max_points)
+
+
+__all__ = ('Retention',)
@@ -23,6 +23,12 @@
 # marker: see MPL doc
 
 import datetime
+import numpy as np
+
+from .column import as_timestamps, as_values
+from .retention import make_retention
+from .reorder import split
+from .series import Series
 
 _SUPPORTED_ARGS = dict(marker=1, size=1, color=1, alpha=1, zorder=1)
 _FLOAT_ARGS = dict(alpha=1, size=1)
@@ -31,12 +37,23 @@ class Channel:
     def __init__(self, stream, ax, **kw):
         self.stream = stream
         self.dirty = True
-        self.datax = []
-        self.datay = []
+        # samples older than the newest stored one are merged in before the data is read
+        self._data = Series()
         self.axes = ax
+        # the offsets are the samples in view, see update_view()
+        self._view_key = None
+        self._version = 0
+
+        max_age = max_points = None
 
         args = {}
         for k, v in kw.items():
+            if k == 'max_age':
+                max_age = float(v)
+                continue
+            if k == 'max_points':
+                max_points = int(v)
+                continue
             if not k in _SUPPORTED_ARGS:
                 raise Exception("Scatter: unknown arg '{}'".format(k))
             if k in _FLOAT_ARGS:
@@ -47,25 +64,108 @@ class Channel:
             else:
                 args[k] = v
 
-        self.artist = self.axes.scatter(self.datax, self.datay, **args)
+        self.retention = make_retention(max_age, max_points)
+
+        self._args = args
+        self.artist = None
+        if ax is not None:
+            self.attach(ax)
 
+    def attach(self, ax):
+        self.axes = ax
+        self.artist = self.axes.scatter(self.datax, self.datay, **self._args)
+        self.dirty = True
+        self._view_key = None
+
+    def detach(self):
+        if self.artist:
+            self.artist.remove()
+        self.artist = None
+        self.axes = None
+
+
+    @property
+    def datax(self):
+        if self._data.late:
+            self._merge_late()
+        return self._data.x.view()
+
+    @property
+    def datay(self):
+        if self._data.late:
+            self._merge_late()
+        return self._data.y.view()
+
+    def y_range(self, i, j):
+        if self._data.late:
+            self._merge_late()
+        return self._data.y_range(i, j)
+
+    def view_range(self, x0, x1):
+        """ (min, max) of the values in [x0, x1] and of the samples just outside """
+        if self._data.late:
+            self._merge_late()
+        return self._data.y_range(*self._data.view_slice(x0, x1))
+
+    def sample_at(self, x, before=False):
+        """ value of the sample nearest to x, with before of the last one at or before x; None if there is none """
+        if self._data.late:
+            self._merge_late()
+        left, right = self._data.around(x)
+        if before or right is None:
+            return None if left is None else left[1]
+        if left is None or right[0] - x < x - left[0]:
+            return right[1]
+        return left[1]
+
+    def data_bounds(self):
+        ymin, ymax = self.y_range(0, len(self._data))
+        if ymin != ymin:
+            return None
+        dx = self._data.x
+        return (dx[0], ymin, dx[-1], ymax)
+
+    def window_range(self, width, x0):
+        """ (min, max) of the values from x0 on, for x0 within `width` of the newest sample """
+        if self._data.late:
+            self._merge_late()
+        return self._data.window_range(width, x0)
 
     def prepare_artists(self):
         if not self.dirty:
             return False
 
-        self.artist.set_offsets(list(zip(self.datax, self.datay)))
+        if self._data.late:
+            self._merge_late()
+        # the view may still change this frame, Stream calls update_view() once it is final
+        self._view_key = None
 
         self.dirty = False
-        self.axes.relim()
         return True
 
+    def update_view(self):
+        x0, x1 = self.axes.get_xlim()
+        width = max(self.axes.bbox.width, 1.0)
 
-    def destroy(self):
-        if self.artist:
-            self.artist.remove()
+        key = (x0, x1, width, self._version)
+        if key == self._view_key:
+            return False
+        self._view_key = key
 
-        self.artist = None
+        # markers centered just outside the limits still show partly
+        sizes = self.artist.get_sizes()
+        radius = np.sqrt(sizes.max()) / 2 * self.axes.figure.dpi / 72 if len(sizes) else 0
+        pad = (x1 - x0) * (radius + 1) / width
+
+        x = self.datax
+        i = int(np.searchsorted(x, x0 - pad, 'left'))
+        j = int(np.searchsorted(x, x1 + pad, 'right'))
+        self.artist.set_offsets(np.column_stack((x[i:j], self.datay[i:j])))
+        return True
+
+
+    def destroy(self):
+        self.detach()
         self.stream = None
 
     def update_from_str(self, tm, line):
@@ -74,8 +174,69 @@ class Channel:
             tm = tm.timestamp() * 1e6
 
         self.dirty = True
-        self.datax.append(tm)
-        self.datay.append(float(line))
-        self.stream.invalidate()
+        self._version += 1
+        value = float(line)
+
+        recorder = self.stream.win.recorder
+        if recorder:
+            recorder.add(self, tm, value)
+
+        prof = self.stream.win.profiler
+        if prof.enabled:
+            prof.points += 1
+
+        data = self._data
+        if len(data) and tm < data.x[-1]:
+            if data.add_late(tm, value):
+                self._merge_late()
+        else:
+            data.append(tm, value)
+            self._evict()
+        self.stream.invalidate(self)
+
+    def update_from_arrays(self, tms, values):
+        x = as_timestamps(tms)
+        y = as_values(values)
+        if len(x) != len(y):
+            raise Exception("Scatter: got {} timestamps and {} values".format(len(x), len(y)))
+        if not len(x):
+            return
+
+        recorder = self.stream.win.recorder
+        if recorder:
+            recorder.add_many(self, x, y)
+
+        prof = self.stream.win.profiler
+        if prof.enabled:
+            prof.points += len(x)
+
+        self.dirty = True
+        self._version += 1
+
+        order, k = split(x, self._data.last())
+        if order is not None:
+            x, y = x[order], y[order]
+        if k:
+            if self._data.add_late_many(x[:k], y[:k]):
+                self._merge_late()
+            x, y = x[k:], y[k:]
+
+        if len(x):
+            self._data.extend(x, y)
+            self._evict()
+        self.stream.invalidate(self)
+
+    def _merge_late(self):
+        if self._data.merge_late():
+            self._version += 1
+            self.dirty = True
+            self._evict()
+
+    def _evict(self):
+        retention = self.retention or self.stream.retention
+        if retention:
+            k = retention.excess(self._data.x.view())
+            if k:
+                self._data.drop_front(k)
 
 
@@ -0,0 +1,145 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import heapq
+import time
+
+# idle ticks in a row before the polling starts to slow down
+_IDLE_TICKS = 10
+
+class Scheduler:
+    """ The frame clock of a window.
+
+    A single GUI timer drains the ingest buffers and polls all updaters of
+    the window, lets those which have news update their streams, then draws
+    at most once for all of them. The timer runs at fps while there is something to show and backs
+    off up to idle_interval (ms) when nothing happens. A slow frame pushes
+    the next one back, so drawing never takes more than half of the time.
+    While backed off the timer still ticks at fps, but a tick only looks at
+    the flag notify() sets, so data from other threads is not kept waiting.
+    """
+
+    def __init__(self, win, fps=5.0, idle_interval=1000):
+        self.win = win
+        self.updaters = []
+        self.frame_interval = 1000.0 / fps
+        self.idle_interval = max(idle_interval, self.frame_interval)
+        # time between polls, at least the timer interval
+        self.interval = self.frame_interval
+        self._idle = 0
+        self._next_poll = 0.0
+        self._notified = False
+        # (time, seq, callback) heap of call_later()
+        self._timeouts = []
+        self._seq = 0
+
+        self.timer = win.figure.canvas.new_timer(interval=int(self.interval))
+        self.timer.add_callback(self.tick)
+        self._running = False
+
+    def add(self, updater, arg):
+        self.updaters.append((updater, arg))
+        self.wake()
+
+    def remove(self, arg):
+        self.updaters = [(u, a) for u, a in self.updaters if a is not arg]
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self.timer.start()
+
+    def stop(self):
+        if self._running:
+            self._running = False
+            self.timer.stop()
+
+    def _set_timer(self, interval):
+        if int(interval) != self.timer.interval:
+            self.timer.interval = int(interval)
+
+    def wake(self):
+        self._idle = 0
+        self.interval = self.frame_interval
+        self._next_poll = 0.0
+        self._set_timer(self.frame_interval)
+        self.start()
+
+    def call_later(self, delay, callback):
+        """ call callback on a tick delay seconds from now """
+        self._seq += 1
+        heapq.heappush(self._timeouts, (time.perf_counter() + delay, self._seq, callback))
+        self.start()
+
+    def _run_timeouts(self, now):
+        while self._timeouts and self._timeouts[0][0] <= now:
+            heapq.heappop(self._timeouts)[2]()
+
+    def notify(self):
+        """ new data is waiting, the next tick polls; safe to call from any thread """
+        self._notified = True
+
+    def poll(self):
+        busy = self.win.drain() > 0
+        for updater, arg in list(self.updaters):
+            if updater.is_update_needed(arg):
+                updater.update(arg)
+                busy = True
+        return busy
+
+    def tick(self):
+        start = time.perf_counter()
+
+        due = self._timeouts and self._timeouts[0][0] <= start
+        if self._notified:
+            self._notified = False
+        elif start < self._next_poll and not due:
+            return
+        self._run_timeouts(start)
+
+        if self.win.profiler.enabled:
+            busy = self.win.profiler.call(('poll',), self.poll)
+        else:
+            busy = self.poll()
+        self.win.prepare_artists()
+        if self.win.changed_streams:
+            self.win.render()
+            busy = True
+
+        if busy:
+            self._idle = 0
+            spent = (time.perf_counter() - start) * 1000.0
+            self.interval = max(self.frame_interval, spent * 2)
+            self._next_poll = 0.0
+            self._set_timer(self.interval)
+            if self.win.profiler.enabled:
+                self.win.profiler.end_frame(spent / 1000.0, self.frame_interval / 1000.0)
+        else:
+            self._idle += 1
+            if self._idle >= _IDLE_TICKS:
+                self.interval = min(self.interval * 2, self.idle_interval)
+            self._next_poll = start + self.interval / 1000.0
+            self._set_timer(self.frame_interval)
+
+
+__all__ = ('Scheduler',)
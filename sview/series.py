@@ -0,0 +1,149 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import numpy as np
+
+from .column import Column
+from .minmax import MinMaxIndex, SlidingMinMax
+from .reorder import Late
+
+class Series:
+    """ Samples sorted by time: x and y columns and a min/max index over y.
+
+    Samples older than the newest stored one wait in `late` until the channel
+    calls merge_late(). Queries read the stored samples only, so a channel
+    merges first.
+    """
+
+    def __init__(self, dtype=np.float64):
+        self.x = Column(np.float64)
+        self.y = Column(dtype)
+        self.index = MinMaxIndex()
+        self.late = Late()
+        # min/max over a time window, fed lazily by window_range()
+        self._window = None
+        self._window_pos = 0
+
+    def __len__(self):
+        return len(self.x)
+
+    def last(self):
+        """ time of the newest stored sample, None if there is none """
+        return self.x[-1] if len(self.x) else None
+
+    def append(self, x, y):
+        self.x.append(x)
+        self.y.append(y)
+        self.index.append(y)
+
+    def extend(self, x, y):
+        self.x.extend(x)
+        self.y.extend(y)
+        self.index.extend(y)
+
+    def truncate(self, n):
+        if self._window is not None and self.index.appended - len(self) + n < self._window_pos:
+            # the window has seen samples that go now, it is fed again from scratch
+            self._window = None
+        self.x.truncate(n)
+        self.y.truncate(n)
+        self.index.truncate(self.y.view(), n)
+
+    def drop_front(self, n):
+        self.x.drop_front(n)
+        self.y.drop_front(n)
+        self.index.drop_front(n)
+
+    def horizon(self):
+        # once samples have been dropped from the front, late ones older than what is left would go right away
+        if len(self.index) < self.index.appended:
+            return self.x[0]
+        return -np.inf
+
+    def add_late(self, x, y):
+        """ keep a late sample for the next merge, True once a batch of them is waiting """
+        return x >= self.horizon() and self.late.add(x, y)
+
+    def add_late_many(self, x, y):
+        keep = x >= self.horizon()
+        return self.late.add_many(x[keep], y[keep])
+
+    def merge_late(self):
+        """ merge the waiting late samples into the columns, False if there were none """
+        x, y = self.late.take()
+        if not len(x):
+            return False
+
+        # the stored samples from the oldest late one on are merged with the late ones
+        k = int(np.searchsorted(self.x.view(), x[0], side='right'))
+        tail_x = self.x.view()[k:]
+        pos = np.searchsorted(tail_x, x, side='right')
+        mx = np.insert(tail_x, pos, x)
+        my = np.insert(self.y.view()[k:], pos, y.astype(self.y.dtype, copy=False))
+
+        self.truncate(k)
+        self.extend(mx, my)
+        self._window = None
+        return True
+
+    def y_range(self, i, j):
+        return self.index.query(self.y.view(), i, j)
+
+    def view_slice(self, x0, x1):
+        """ (i, j) of the samples in [x0, x1] and of the ones just outside """
+        x = self.x.view()
+        i = max(int(np.searchsorted(x, x0, 'left')) - 1, 0)
+        j = int(np.searchsorted(x, x1, 'right')) + 1
+        return i, j
+
+    def around(self, t):
+        """ the (x, y) samples at or before t and after it, None where there is none """
+        x = self.x.view()
+        i = int(x.searchsorted(t, 'right'))
+        left = (x[i - 1], self.y[i - 1]) if i else None
+        right = (x[i], self.y[i]) if i < len(x) else None
+        return left, right
+
+    def window_range(self, width, x0):
+        """ (min, max) of the values from x0 on, for x0 within `width` of the newest sample;
+            samples before the oldest stored one are not counted """
+        x = self.x.view()
+        y = self.y.view()
+        n = len(x)
+        pos = self.index.appended - n
+        if self._window is None or self._window.width != width:
+            self._window = SlidingMinMax(width)
+            self._window_pos = pos + (int(np.searchsorted(x, x[-1] - width)) if n else 0)
+
+        # new samples since the last call, and the last one again: lines move its time when repeats collapse
+        i = max(self._window_pos - pos - 1, 0)
+        self._window.extend(x[i:], y[i:])
+        self._window_pos = pos + n
+
+        if n:
+            # evicted samples may still be in the window
+            x0 = max(x0, x[0])
+        return self._window.query(x0)
+
+
+__all__ = ('Series',)
@@ -0,0 +1,181 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import numpy as np
+
+from multiprocessing import shared_memory
+
+# header: magic, capacity, number of records published, number of records
+# the producer has started to write (ahead of the published count while a
+# write is in progress)
+_MAGIC = 0x73766965775f7262
+_HEADER_WORDS = 8
+_HEADER_SIZE = _HEADER_WORDS * 8
+_H_MAGIC, _H_CAPACITY, _H_SEQ, _H_RESERVED = 0, 1, 2, 3
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+
+    # before 3.13 attaching registers the segment with the resource tracker,
+    # which would unlink it when this process exits
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class ShmRing:
+    """ Ring buffer of (timestamp, value) records in shared memory.
+
+    One producer process writes records with write() or write_many() and
+    publishes them by advancing the sequence counter in the header. Readers
+    in other processes keep their own position and see how many records they
+    missed if the producer lapped them, records overwritten while a reader
+    was copying them are discarded. There is no locking and no
+    serialization: a record is two float64s in place. The producer must be
+    the only writer of a ring.
+
+    The process that creates a ring owns it and should unlink() it when done.
+    Others attach() to it by name.
+    """
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self._header = np.ndarray((_HEADER_WORDS,), dtype=np.int64, buffer=shm.buf)
+        if self._header[_H_MAGIC] != _MAGIC:
+            raise Exception("ShmRing: {} is not a ring buffer".format(shm.name))
+        self.capacity = int(self._header[_H_CAPACITY])
+        self._records = np.ndarray((self.capacity, 2), dtype=np.float64, buffer=shm.buf, offset=_HEADER_SIZE)
+
+    @classmethod
+    def create(cls, capacity=1 << 16, name=None):
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_HEADER_SIZE + capacity * 16)
+        header = np.ndarray((_HEADER_WORDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[_H_CAPACITY] = capacity
+        header[_H_MAGIC] = _MAGIC
+        del header
+        return cls(shm, True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(_attach(name), False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def seq(self):
+        return int(self._header[_H_SEQ])
+
+    def write(self, tm, value):
+        seq = int(self._header[_H_SEQ])
+        self._header[_H_RESERVED] = seq + 1
+        self._records[seq % self.capacity] = (tm, value)
+        self._header[_H_SEQ] = seq + 1
+
+    def write_many(self, tms, values):
+        tms = np.asarray(tms, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        n = len(tms)
+        seq = int(self._header[_H_SEQ])
+        if n > self.capacity:
+            # only the last capacity records would survive anyway
+            skip = n - self.capacity
+            tms, values, n = tms[skip:], values[skip:], self.capacity
+        else:
+            skip = 0
+
+        # reserved first: a reader copying meanwhile sees its slots may be overwritten
+        self._header[_H_RESERVED] = seq + skip + n
+        seq += skip
+        i = seq % self.capacity
+        head = min(n, self.capacity - i)
+        self._records[i:i + head, 0] = tms[:head]
+        self._records[i:i + head, 1] = values[:head]
+        self._records[:n - head, 0] = tms[head:]
+        self._records[:n - head, 1] = values[head:]
+        self._header[_H_SEQ] = seq + n
+
+    def read(self, start):
+        """ records [start, seq) still in the ring, returns (next start, lost, records) """
+        end = int(self._header[_H_SEQ])
+        lost = max(end - start - self.capacity, 0)
+        start += lost
+        if start >= end:
+            return (end, lost, self._records[:0].copy())
+
+        i = start % self.capacity
+        j = i + (end - start)
+        if j <= self.capacity:
+            records = self._records[i:j].copy()
+        else:
+            records = np.concatenate((self._records[i:], self._records[:j - self.capacity]))
+
+        # the producer may have lapped the reader while it was copying
+        late = int(self._header[_H_RESERVED]) - self.capacity - start
+        if late > 0:
+            records = records[late:]
+            lost += late
+
+        return (end, lost, records)
+
+    def close(self):
+        self._header = None
+        self._records = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+class RingReader:
+    """ Feeds new records of a ring into a channel, drained by the window once per frame """
+
+    def __init__(self, ring, channel):
+        self.ring = ring
+        self.channel = channel
+        self.position = ring.seq
+        self.overruns = 0
+
+    @property
+    def pending(self):
+        return self.ring.seq - self.position
+
+    def drain(self):
+        self.position, lost, records = self.ring.read(self.position)
+        self.overruns += lost
+        if len(records):
+            self.channel.update_from_arrays(records[:, 0], records[:, 1])
+        return len(records)
+
+
+__all__ = ('ShmRing', 'RingReader')
@@ -23,6 +23,8 @@
 import datetime
 import traceback
 import random
+import time
+import numpy as np
 
 class RandomUpdater:
     def __init__(self):
@@ -85,3 +87,62 @@ class RandomUpdater2:
             print("======================================================================================")
 
         stream.win.prepare_artists()
+
+
+def random_walk(n, start = 0.0, rate = 1000.0, seed = None, value = 0.0):
+    """ n samples of a random walk, rate is in samples per second, start in microseconds """
+    rng = np.random.default_rng(seed)
+    tms = start + np.arange(n) * (1e6 / rate)
+    values = value + rng.standard_normal(n).cumsum()
+    return tms, values
+
+class SyntheticUpdater:
+    """ random walks at a fixed sample rate per channel, kind is 'line', 'scatter' or 'text' """
+    def __init__(self, channels = 4, rate = 1000.0, kind = 'line', seed = None, **channel_args):
+        self.n_channels = channels
+        self.rate = rate
+        self.kind = kind
+        self.channel_args = channel_args
+        self.rng = np.random.default_rng(seed)
+        self.channels = None
+        self.values = None
+        self.last = None
+        self.count = 0
+
+    def is_update_needed(self, stream):
+        return True
+
+    def _create_channels(self, stream):
+        ax = stream.add_axes("%.2f")
+        if self.kind == 'line':
+            create = ax.add_line
+        elif self.kind == 'scatter':
+            create = ax.add_scatter
+        elif self.kind == 'text':
+            create = ax.add_text_channel
+        else:
+            raise Exception("Unknown channel kind: {}".format(self.kind))
+        self.channels = [create("syn_{}".format(i), **self.channel_args) for i in range(self.n_channels)]
+        self.values = np.zeros(self.n_channels)
+
+    def update(self, stream):
+        now = time.time() * 1e6
+        if self.channels is None:
+            self._create_channels(stream)
+            self.last = now
+            return
+
+        n = int((now - self.last) * self.rate / 1e6)
+        if n <= 0:
+            return
+
+        tms = self.last + np.arange(1, n+1) * (1e6 / self.rate)
+        self.last = tms[-1]
+        for i, ch in enumerate(self.channels):
+            values = self.values[i] + self.rng.standard_normal(n).cumsum()
+            self.values[i] = values[-1]
+            if self.kind == 'text':
+                ch.update_from_arrays(tms, ["{:.3f}".format(v) for v in values])
+            else:
+                ch.update_from_arrays(tms, values)
+        self.count += n * len(self.channels)
@@ -21,7 +21,6 @@
 # SOFTWARE.
 
 import matplotlib.pyplot as plt
-import bisect
 
 from matplotlib.ticker import FuncFormatter
 from matplotlib.transforms import Bbox
@@ -29,12 +28,18 @@ from matplotlib.transforms import Bbox
 from .line    import Channel as LineChannel
 from .scatter import Channel as ScatterChannel
 from .text    import Channel as TextChannel
-from .dates   import Formatter, Locator
+from .dates   import Formatter, Locator, as_datetime
+from .retention import make_retention
 
 from datetime import datetime, timedelta
 
 AXES_FONT_H = 20.0
 AXES_FONT_W = 60.0
+# seconds a zoomed stream keeps its limits before it scales to its data again
+_ZOOM_TIMEOUT = 30
+
+def _is_missing(v):
+    return v is None or v != v
 
 def _remove_arg(kw, arg):
     if arg in kw:
@@ -50,9 +55,10 @@ class _CustomFmt:
 _gid = 1
 
 class AxesProxy:
-    def __init__(self, stream, ax):
+    def __init__(self, stream, slot):
+        # slot: the number of the axes in the stream, the matplotlib axes exist only while the stream is shown
         self.stream = stream
-        self.ax = ax
+        self.slot = slot
         self.def_colors = ['#008fd5', '#fc4f30', '#e5ae38', '#6d904f', '#8b8b8b', '#810f7c']  # 538 style
         #self.def_colors = ['#348ABD', '#A60628', '#7A68A6', '#467821', '#D55E00', '#CC79A7', '#56B4E9', '#009E73', '#F0E442', '#0072B2'] # bmh
         self.cur_color = 0
@@ -64,21 +70,31 @@ class AxesProxy:
         elif isinstance(kw['color'], int):
             kw['color'] = self.def_colors[kw['color'] % len(self.def_colors)]
 
+    @property
+    def ax(self):
+        return self.stream.axes[self.slot] if self.stream.shown else None
+
     def add_line(self, name, **kw):
         self._set_color(kw)
         kw['zorder'] = len(self.stream.channels)+1
-        return self.stream._create_channel(LineChannel, self.ax, name, **kw)
+        return self.stream._create_channel(LineChannel, self.slot, name, **kw)
 
     def add_scatter(self, name, **kw):
         self._set_color(kw)
         kw['zorder'] = len(self.stream.channels)+1
-        return self.stream._create_channel(ScatterChannel, self.ax, name, **kw)
+        return self.stream._create_channel(ScatterChannel, self.slot, name, **kw)
 
     def add_text_channel(self, name, **kw):
-        return self.stream._create_channel(TextChannel, self.ax, name, **kw)
+        return self.stream._create_channel(TextChannel, self.slot, name, **kw)
 
     def add_links_channel(self, name, **kw):
-        return self.stream._create_channel(LineChannel, self.ax, name, **kw)
+        return self.stream._create_channel(LineChannel, self.slot, name, **kw)
+
+
+def stream_key(stream):
+    if getattr(stream, 'title', None):
+        return stream.title
+    return "#{}".format(stream.win.streams.index(stream))
 
 
 class Stream:
@@ -86,47 +102,105 @@ class Stream:
     def create_axes(self):
         return a
 
-    def __init__(self, win, title, time_window):
+    def __init__(self, win, title, time_window, max_age=None, max_points=None, shown=True):
         self.channels = []
+        self.channel_names = {}
+        # what changed since the last frame, dicts as ordered sets; dirty means everything
+        self.dirty_channels = {}
+        self.legend_axes = {}
         self.win = win
         self.axes = []
+        # (fmt, weight, width_scale) of every axes, the axes are made from them when the stream is shown
+        self.axes_specs = []
         self.time_window = time_window
+        self.retention = make_retention(max_age, max_points)
+        self.tz = None
 
         if title:
-            self.title_object = self.win.figure.text(0.1, 0.1, title, size='medium', style='italic')
             self.title = title
-        else:
-            self.title_object = None
+        self.title_object = None
 
         #self.axes[0].xaxis_date(None)
         #self.ly = ax.axvline(color='k')
         self.text_channels = []
+        self.value_channels = []
         self.last_tm = None
         self.custom_scale_till_time = None
+        self.region = None
+        self.locator = None
 
-        self.invalidate()
+        # bumped on every change, status lines are memoized per pixel of the time axis and version
+        self.version = 0
+        self._coord_key = None
+        self._coords = {}
 
-    def _format_coord(self, ax, x, y):
-        status = datetime.fromtimestamp(float(x)/1e6).strftime(r"DATE: %Y/%m/%d   %H:%M:%S.%f  ")
+        # streams off the page of the window keep their data but have no axes and artists
+        self.shown = False
+        if shown:
+            self.show()
 
-        for ch in self.channels:
-            if isinstance(ch, LineChannel) or isinstance(ch, ScatterChannel):
+        self.invalidate()
 
-                dx = ch.datax
-                dy = ch.datay
+    def _xlim_changed(self, ax):
+        self._coord_key = None
+        # decimated, cold and scatter channels follow the view whoever changed it, the toolbar included
+        self._update_views()
 
-                i = bisect.bisect_left(dx, x)
+    def _format_coord(self, ax, x, y):
+        width = ax.bbox.width
+        key = self._coord_key
+        if key is None or key[0] != self.version or key[3] != width:
+            x0, x1 = ax.get_xlim()
+            key = self._coord_key = (self.version, x0, x1, width)
+            self._coords = {}
+
+        x0, x1 = key[1], key[2]
+        px = int((x - x0) * width / (x1 - x0)) if x1 > x0 else 0
+        status = self._coords.get(px)
+        if status is None:
+            status = self._coords[px] = self._status(x)
+        return status
 
-                if i < len(dx):
-                    if dy[i] is not None:
-                        status += "  {}: {:7}".format(ch.name, ch.axes.myfmt % (dy[i],))
-                    else:
-                        status += "  {}: None".format(ch.name)
+    def _status(self, x):
+        status = as_datetime(x, self.locator.tz if self.locator else None).strftime(r"DATE: %Y/%m/%d   %H:%M:%S.%f  ")
+
+        for ch, v in self.nearest(x):
+            if not _is_missing(v):
+                status += "  {}: {:7}".format(ch.name, ch.axes.myfmt % (v,))
+            else:
+                status += "  {}: None".format(ch.name)
 
         return status
 
+    def nearest(self, x, before=False):
+        """ (channel, value) of the sample nearest to x in every non-empty line and scatter channel,
+            with before the last sample at or before x """
+        found = []
+        for ch in self.value_channels:
+            v = ch.sample_at(x, before)
+            if v is not None:
+                found.append((ch, v))
+        return found
+
+
+    def set_timezone(self, tz):
+        """ time zone of the time axis: a tzinfo, hours east of UTC or None for the one of dates.set_timezone() """
+        self.tz = tz
+        if self.locator:
+            self.locator.set_timezone(tz)
+        self.invalidate()
+
+    def set_retention(self, max_age=None, max_points=None):
+        # applies to channels which don't have their own max_age/max_points
+        self.retention = make_retention(max_age, max_points)
 
     def add_axes(self, fmt, weight = 1.0, width_scale = 1.0):
+        self.axes_specs.append((fmt, weight, width_scale))
+        if self.shown:
+            self._create_axes(fmt, weight, width_scale)
+        return AxesProxy(self, len(self.axes_specs) - 1)
+
+    def _create_axes(self, fmt, weight, width_scale):
         global _gid
         if self.axes:
             ax = self.win.figure.add_axes( (0, 0, 0.1, 0.1), gid = str(_gid), sharex = self.axes[0])
@@ -138,8 +212,9 @@ class Stream:
         ax.links = None
 
         if len(self.axes) == 1:
-            loc = Locator()
+            loc = self.locator = Locator(self.tz)
             formatter = Formatter(loc)
+            formatter.profiler = self.win.profiler
             self.axes[0].xaxis.set_major_locator(loc)
             self.axes[0].xaxis.set_major_formatter(formatter)
 
@@ -148,56 +223,135 @@ class Stream:
         ax.width_scale = width_scale
 
         ax.format_coord = lambda x, y: self._format_coord(ax, x, y)
+        ax.callbacks.connect('xlim_changed', self._xlim_changed)
 
         ax.yaxis.set_major_formatter(FuncFormatter(_CustomFmt(fmt)))
         ax.myfmt = fmt
-        return AxesProxy(self, ax)
+        return ax
 
-    def _create_channel(self, type_v, ax, name, **kw):
-        for c in self.channels:
-            if c.name == name:
-                raise Exception("Channel {} has been added already".format(name))
+    def _create_channel(self, type_v, slot, name, **kw):
+        if name in self.channel_names:
+            raise Exception("Channel {} has been added already".format(name))
 
-        channel = type_v(self, ax, **kw)
+        channel = type_v(self, None, **kw)
         channel.name = name
+        channel.slot = slot
         self.channels.append(channel)
-        channel.artist.set_label(name)
-        self.invalidate()
-        legend = ax.legend(shadow=True, fancybox=True)
-        legend.zorder = 100
-        legend.get_frame().set_facecolor('#dfdfdf')
+        self.channel_names[name] = channel
+        if isinstance(channel, TextChannel):
+            self.text_channels.append(channel)
+        else:
+            self.value_channels.append(channel)
 
+        if self.shown:
+            self._attach(channel)
+        self.invalidate()
         return channel
 
-
-    def destroy(self):
+    def _attach(self, channel):
+        ax = self.axes[channel.slot]
+        channel.attach(ax)
+
+        if isinstance(channel, TextChannel):
+            # shown as the axes title, not in the legend
+            return
+
+        channel.artist.set_label(channel.name)
+        if self.win.blit:
+            channel.artist.set_animated(True)
+        # built once per frame in prepare_artists, not on every channel
+        self.legend_axes[ax] = None
+
+    def show(self):
+        """ create the axes and artists, the window does it when the stream comes into view """
+        if self.shown:
+            return
+        self.shown = True
+
+        if getattr(self, 'title', None):
+            self.title_object = self.win.figure.text(0.1, 0.1, self.title, size='medium', style='italic')
+        for spec in self.axes_specs:
+            self._create_axes(*spec)
         for c in self.channels:
-            c.destroy()
+            self._attach(c)
+        self.invalidate()
+
+    def hide(self):
+        """ drop the axes and artists, the channels keep their data """
+        if not self.shown:
+            return
+        self.shown = False
 
+        for c in self.channels:
+            c.detach()
         for a in self.axes:
             self.win.figure.delaxes(a)
+        if self.title_object:
+            self.title_object.remove()
+
+        self.axes = []
+        self.title_object = None
+        self.locator = None
+        self.region = None
+        self.legend_axes = {}
+        self.custom_scale_till_time = None
+
+    def _update_legends(self):
+        for ax in self.legend_axes:
+            legend = ax.legend(shadow=True, fancybox=True)
+            legend.zorder = 100
+            legend.get_frame().set_facecolor('#dfdfdf')
+            if self.win.blit:
+                # drawn once, over the channels, instead of also into the saved background
+                legend.set_animated(True)
+        self.legend_axes = {}
+
+
+    def destroy(self):
+        self.hide()
+        for c in self.channels:
+            c.destroy()
 
         self.axes = None
         self.channels = None
+        self.channel_names = None
 
     def on_zoomed(self):
         if self.title_object:
-            self.custom_scale_till_time = datetime.now() + timedelta(0, 30)
+            self.custom_scale_till_time = datetime.now() + timedelta(0, _ZOOM_TIMEOUT)
+            # prepared once more when the zoom times out, nothing to do till then
+            self.win.scheduler.call_later(_ZOOM_TIMEOUT, self._zoom_timeout)
             self.title_object.set_text(self.title + " Zoomed")
             self.title_object.set_color('#FF0000')
 
 
+    def _zoom_timeout(self):
+        if not self.custom_scale_till_time:
+            # hidden or scaled meanwhile
+            return
+        left = (self.custom_scale_till_time - datetime.now()).total_seconds()
+        if left > 0:
+            # zoomed again meanwhile
+            self.win.scheduler.call_later(left, self._zoom_timeout)
+        else:
+            self.win.invalidate(self)
+
     def set_position(self, x, y, w, h, abs_w, abs_h):
+        self.region = (x, y, w, h)
 
         top_padding    = AXES_FONT_H/abs_h * 0.15
         right_padding  = AXES_FONT_H/abs_h * 0.15
-        bottom_padding = AXES_FONT_H/abs_h
+        bottom_padding = AXES_FONT_H/abs_h * 1.1
 
         axes_interval = AXES_FONT_H/abs_h * 0.1
 
+        # nothing of a stream is drawn outside of its region, the blitter repaints regions
+        region_box = Bbox.from_bounds(x*abs_w, y*abs_h, w*abs_w, h*abs_h)
+
         if self.title_object:
             top_padding += AXES_FONT_H/abs_h * 1.1
             self.title_object.set_position((x + AXES_FONT_W/abs_w * 3, y + (1.0 - AXES_FONT_H/abs_h) * h))
+            self.title_object.set_clip_box(region_box)
 
         total_weight = 0.0
         for ax in self.axes:
@@ -212,45 +366,95 @@ class Stream:
 
             if first:
                 first = False
+                for o in ax.xaxis.get_ticklabels():
+                    o.set_clip_box(region_box)
             else:
                 for o in ax.xaxis.get_ticklabels():
                     o.set_visible(False)
 
-            clip_box = Bbox(((0, yc*abs_h), (abs_w, (yc + ax_h - axes_interval)*abs_h)))
+            clip_box = Bbox(((x*abs_w, yc*abs_h), ((x + w)*abs_w, (yc + ax_h - axes_interval)*abs_h)))
 
             for o in ax.yaxis.get_ticklabels():
                 o.set_clip_box(clip_box)
 
             yc += ax_h
 
-        for a in self.axes:
-            a.relim()
+        self._update_views()
 
 
-    def invalidate(self):
-        self.dirty = True
-        self.win.invalidate()
+    def invalidate(self, channel=None):
+        # channel: only that one changed, otherwise all of the stream is prepared and rescaled
+        if channel is None:
+            self.dirty = True
+        else:
+            self.dirty_channels[channel] = None
+        self.version += 1
+        self.win.invalidate(self)
 
     def prepare_artists(self):
+        prof = self.win.profiler
+        key = stream_key(self) if prof.enabled else None
 
-        changed = False
+        if not self.shown:
+            # prepared in full when shown
+            self.dirty = False
+            self.dirty_channels = {}
+            return False
+
+        full = self.dirty
+        channels = self.channels if full else list(self.dirty_channels)
+        self.dirty = False
+        self.dirty_channels = {}
 
-        if self.dirty:
-            for c in self.channels:
+        changed = False
+        for c in channels:
+            if key:
+                changed = prof.call((key, c.name, 'prepare'), c.prepare_artists) or changed
+            else:
                 changed = c.prepare_artists() or changed
 
-            self.dirty = False
+        if self.legend_axes:
+            self._update_legends()
+            changed = True
+
+        if self.custom_scale_till_time and datetime.now() < self.custom_scale_till_time:
+            # zoomed, the scale is left alone until the zoom times out
+            if changed:
+                self._update_views(key)
+            return changed
+
+        if changed or full or self.custom_scale_till_time:
+            changed = True
+            if key:
+                prof.call((key, 'scale'), self.scale_to_default)
+            else:
+                self.scale_to_default()
 
-        if changed:
+        return changed
 
-            for a in self.axes:
-                a.relim()
+    def _update_views(self, key=None):
+        # key: the stream key when the window profiler is on
+        for c in self.channels:
+            if isinstance(c, LineChannel) or isinstance(c, ScatterChannel):
+                if key:
+                    self.win.profiler.call((key, c.name, 'view'), c.update_view)
+                else:
+                    c.update_view()
 
-        if not self.custom_scale_till_time or datetime.now() >= self.custom_scale_till_time:
-            self.scale_to_default()
 
+    def readout(self, x):
+        """ the time at x and the value of every channel there, from the last sample at or before it """
+        lines = [as_datetime(x, self.locator.tz if self.locator else None).strftime("%H:%M:%S.%f")]
+        for ch, v in self.nearest(x, before=True):
+            lines.append("{}: {}".format(ch.name, "None" if _is_missing(v) else ch.axes.myfmt % (v,)))
+        for ch in self.text_channels:
+            text = ch.text_at(x)
+            if text is not None:
+                lines.append("{}: {}".format(ch.name, text))
+        return "\n".join(lines)
 
     def mouse_move(self, event):
+        # without blitting, see hover.Hover for the overlay
         if self.text_channels:
 
             xmin = None
@@ -260,7 +464,7 @@ class Stream:
                 doredraw = r[0] or doredraw
 
             if doredraw:
-                event.canvas.draw()
+                event.canvas.draw_idle()
 
 
 
@@ -275,7 +479,8 @@ class Stream:
                 tc.mouse_leave(event)
 
     def set_xrange(self, xmin, xmax):
-
+        if not self.shown:
+            return
 
         axs = {}
 
@@ -295,54 +500,67 @@ class Stream:
             miny = 0
 
             for ch in chs:
-                dx = ch.datax
-                dy = ch.datay
-
-                i = bisect.bisect_left(dx, xmin)
-                iend = bisect.bisect_right(dx, xmax)
+                lo, hi = ch.view_range(xmin, xmax)
 
-                if i > 0:
-                    i-=1
-
-                if iend < len(dx):
-                    iend+=1
-
-                while i < iend:
-
-                    if dy[i] is not None:
-                        if first:
-                            maxy = miny = dy[i]
-                            first = False
-                        else:
-                            maxy = max(maxy, dy[i])
-                            miny = min(miny, dy[i])
-                    i+=1
+                if not _is_missing(lo):
+                    if first:
+                        miny, maxy = lo, hi
+                        first = False
+                    else:
+                        maxy = max(maxy, hi)
+                        miny = min(miny, lo)
 
             if not first:
                 chs[0].axes.set_ylim(miny - (maxy-miny)*0.05, maxy + (maxy-miny)*0.05)
 
         self.axes[0].set_xlim(xmin, xmax)
+        self._update_views()
 
 
     def scale_to_default(self):
+        if not self.shown:
+            return
+
         if self.title_object:
             self.custom_scale_till_time = None
             self.title_object.set_text(self.title)
             self.title_object.set_color('#000000')
 
-        if not self.time_window:
-            dl = self.axes[0].dataLim
-            xwidth = (dl.x1 - dl.x0) * 0.01
-            self.axes[0].set_xlim(xmin=dl.x0 - xwidth, xmax=dl.x1 + xwidth)
-            for a in self.axes:
-                dl = a.dataLim
-                yoff = (dl.y1 - dl.y0) * 0.03
-                a.set_ylim(ymin=dl.y0-yoff, ymax=dl.y1+yoff)
-        else:
-            dl = self.axes[0].dataLim
-            xwidth = self.time_window*1000*1000
-            xoff = xwidth * 0.01
-            self.axes[0].set_xlim(xmin=dl.x1-xwidth+xoff, xmax=dl.x1+xoff)
-            yoff = (dl.y1 - dl.y0) * 0.03
-            for a in self.axes:
-                a.set_ylim(ymin=dl.y0-yoff, ymax=dl.y1+yoff)
+        # bounds kept by the channels, (xmin, ymin, xmax, ymax) per axes
+        bounds = {}
+        for c in self.channels:
+            if isinstance(c, LineChannel) or isinstance(c, ScatterChannel):
+                b = c.data_bounds()
+                if b:
+                    ab = bounds.get(c.axes)
+                    bounds[c.axes] = b if ab is None else (min(ab[0], b[0]), min(ab[1], b[1]), max(ab[2], b[2]), max(ab[3], b[3]))
+
+        if bounds:
+            x0 = min(b[0] for b in bounds.values())
+            x1 = max(b[2] for b in bounds.values())
+
+            if not self.time_window:
+                xwidth = (x1 - x0) * 0.01
+                self.axes[0].set_xlim(xmin=x0 - xwidth, xmax=x1 + xwidth)
+                for a, b in bounds.items():
+                    yoff = (b[3] - b[1]) * 0.03
+                    a.set_ylim(ymin=b[1]-yoff, ymax=b[3]+yoff)
+            else:
+                xwidth = self.time_window*1000*1000
+                xoff = xwidth * 0.01
+                xmin = x1 - xwidth + xoff
+                self.axes[0].set_xlim(xmin=xmin, xmax=x1+xoff)
+
+                # only what is in the window counts
+                ranges = {}
+                for c in self.channels:
+                    if c.axes in bounds and (isinstance(c, LineChannel) or isinstance(c, ScatterChannel)):
+                        lo, hi = c.window_range(xwidth, xmin)
+                        if not _is_missing(lo):
+                            r = ranges.get(c.axes)
+                            ranges[c.axes] = (lo, hi) if r is None else (min(r[0], lo), max(r[1], hi))
+                for a, (lo, hi) in ranges.items():
+                    yoff = (hi - lo) * 0.03
+                    a.set_ylim(ymin=lo-yoff, ymax=hi+yoff)
+
+        self._update_views()
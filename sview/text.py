@@ -22,6 +22,12 @@
 
 # marker: see MPL doc
 
+import bisect
+import datetime
+
+from .column import as_timestamps
+from .retention import make_retention
+
 _SUPPORTED_ARGS = dict(size=1, color=1, alpha=1, zorder=1)
 _FLOAT_ARGS = dict(alpha=1, size=1)
 
@@ -33,8 +39,16 @@ class Channel:
         self.data = []
         self.axes = ax
 
+        max_age = max_points = None
+
         args = {}
         for k, v in kw.items():
+            if k == 'max_age':
+                max_age = float(v)
+                continue
+            if k == 'max_points':
+                max_points = int(v)
+                continue
             if not k in _SUPPORTED_ARGS:
                 #raise Exception("Line: unknown arg '{}'".format(k))
                 continue
@@ -44,6 +58,16 @@ class Channel:
                 args[k] = str(v)
 
         self.props = args
+        self.retention = make_retention(max_age, max_points)
+
+    def attach(self, ax):
+        self.axes = ax
+        self.dirty = True
+
+    def detach(self):
+        if self.axes:
+            self.axes.set_title('')
+        self.axes = None
 
 
     def prepare_artists(self):
@@ -58,14 +82,68 @@ class Channel:
 
 
     def destroy(self):
-        self.axes.set_title('')
+        self.detach()
         self.stream = None
 
     def update_from_str(self, tm, line):
         self.dirty = True
-        self.datatm.append(tm)
-        self.data.append(line)
-        self.stream.invalidate()
+
+        if isinstance(tm, datetime.datetime):
+            tm = tm.timestamp() * 1e6
+
+        recorder = self.stream.win.recorder
+        if recorder:
+            recorder.add(self, tm, line)
+
+        prof = self.stream.win.profiler
+        if prof.enabled:
+            prof.points += 1
+
+        if self.datatm and tm < self.datatm[-1]:
+            # late entry, after the ones with the same time
+            i = bisect.bisect_right(self.datatm, tm)
+            self.datatm.insert(i, tm)
+            self.data.insert(i, line)
+        else:
+            self.datatm.append(tm)
+            self.data.append(line)
+        self._evict()
+        self.stream.invalidate(self)
+
+    def update_from_arrays(self, tms, lines):
+        tms = as_timestamps(tms).tolist()
+        lines = list(lines)
+        if len(tms) != len(lines):
+            raise Exception("Text: got {} timestamps and {} values".format(len(tms), len(lines)))
+        if not tms:
+            return
+
+        recorder = self.stream.win.recorder
+        if recorder:
+            recorder.add_many(self, tms, lines)
+
+        prof = self.stream.win.profiler
+        if prof.enabled:
+            prof.points += len(tms)
+
+        self.dirty = True
+        if (self.datatm and tms[0] < self.datatm[-1]) or any(b < a for a, b in zip(tms, tms[1:])):
+            entries = sorted(zip(self.datatm + tms, self.data + lines), key=lambda e: e[0])
+            self.datatm = [e[0] for e in entries]
+            self.data = [e[1] for e in entries]
+        else:
+            self.datatm.extend(tms)
+            self.data.extend(lines)
+        self._evict()
+        self.stream.invalidate(self)
+
+    def _evict(self):
+        retention = self.retention or self.stream.retention
+        if retention:
+            k = retention.excess(self.datatm)
+            if k:
+                del self.datatm[:k]
+                del self.data[:k]
 
     def _update_text(self, text, text_tm):
         old_title = self.axes.get_title()
@@ -74,12 +152,20 @@ class Channel:
             return (True, text_tm)
         return (False, )
 
+    def index_at(self, x):
+        """ index of the last entry at or before x, -1 if there is none """
+        return bisect.bisect_right(self.datatm, x) - 1
+
+    def text_at(self, x):
+        i = self.index_at(x)
+        return self.data[i] if i >= 0 else None
+
     def mouse_move(self, event):
-        for i in range(len(self.datatm)-1, -1, -1):
-            if event.xdata >= self.datatm[i]:
-                return self._update_text(self.data[i], self.datatm[i])
+        i = self.index_at(event.xdata)
+        if i >= 0:
+            return self._update_text(self.data[i], self.datatm[i])
 
         return self._update_text('', None)
 
     def mouse_leave(self, event):
-        return self._update_text(self.data[-1], None)
+        return self._update_text(self.data[-1] if self.data else '', None)
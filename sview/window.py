@@ -22,9 +22,13 @@
 
 import matplotlib as mpl
 import matplotlib.pyplot as plt
-import matplotlib.animation as anim
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 import datetime
+import time
+import traceback
 
 mpl.rcParams['axes.facecolor'] = '#d3d3d3'
 mpl.rcParams['axes.edgecolor'] = '#303030'
@@ -39,17 +43,13 @@ mpl.rcParams['font.family'] = 'sans-serif'
 
 
 from .stream import Stream
-
-class _MyAnim(anim.FuncAnimation):
-    def __init__(self, fig, updater, interval, arg):
-        self.run = 0
-        self.updater = updater
-        self.arg = arg
-        super(_MyAnim, self).__init__(fig, lambda x: updater.update(arg), interval=interval, repeat=True)
-
-    def _step(self, *args):
-        if self.updater.is_update_needed(self.arg):
-            super(_MyAnim, self)._step(*args)
+from .blit   import Blitter
+from .scheduler import Scheduler
+from .ingest import IngestBuffer
+from .shmring import RingReader
+from .record import Recorder
+from .perf   import Profiler, Hud
+from .hover  import Hover
 
 
 _all_windows = []
@@ -58,11 +58,44 @@ class Window:
     def draw_event(self, event):
         print("draw_event")
 
-    def __init__(self, title = 'Figure 1', updater = None):
-        self.figure = plt.figure()
+    def __init__(self, title = 'Figure 1', updater = None, blit = False, fps = 5.0, headless = False, page_size = None):
+        # headless: an Agg canvas outside of pyplot, for rendering to files with save()
+        self.headless = headless
+        if headless:
+            self.figure = Figure()
+            FigureCanvasAgg(self.figure)
+        else:
+            self.figure = plt.figure()
+            _all_windows.append(self)
+
         self.streams = []
         self.dirty = True
-        _all_windows.append(self)
+
+        # page_size: at most that many streams are shown, PageUp/PageDown flip the pages
+        self.page_size = page_size
+        self.page = 0
+        self._layout_dirty = True
+        # streams to prepare next frame and those changed since the last draw, dicts as ordered sets
+        self.dirty_streams = {}
+        self.changed_streams = {}
+        self.ingest_buffers = {}
+        self.ring_readers = []
+        self.recorder = None
+
+        # frame timings, see perf.Profiler; the overlay is toggled with F12
+        self.profiler = Profiler()
+        self.hud = None
+
+        # blit: redraw only the streams that changed instead of the whole figure
+        self.blit = bool(blit) and not headless and getattr(self.figure.canvas, 'supports_blit', False)
+        self.blitter = Blitter(self) if self.blit else None
+
+        # crosshair and readout under the mouse, blitted; without blitting text channels change their titles
+        can_blit = not headless and getattr(self.figure.canvas, 'supports_blit', False)
+        self.hover = Hover(self) if can_blit else None
+
+        # all updaters of the window are polled by one timer, one draw per frame
+        self.scheduler = Scheduler(self, fps)
 
         #self.figure.canvas.mpl_connect('draw_event',     self.draw_event)
         self.figure.canvas.mpl_connect('axes_enter_event',     self.mouse_enter)
@@ -78,32 +111,138 @@ class Window:
 
         self.figure.canvas.mpl_connect('resize_event',      self.resize_event)
 
-        self.figure.canvas.set_window_title(title)
+        if not headless and self.figure.canvas.manager:
+            self.figure.canvas.manager.set_window_title(title)
 
         if updater:
-            self.a = _MyAnim(self.figure, updater, interval=300, arg=self)
+            self.scheduler.add(updater, self)
         #if anim_func:
         #    self.a = anim.FuncAnimation(self.figure, _ClosureWithArg(anim_func, self), frames=1, interval=200, repeat=True)
 
 
-    def create_stream(self, title = None, updater = None, time_window = None):
+    def create_stream(self, title = None, updater = None, time_window = None, max_age = None, max_points = None):
 
-        s = Stream(self, title, time_window)
+        shown = self._on_page(len(self.streams))
+        s = Stream(self, title, time_window, max_age, max_points, shown)
         self.streams.append(s)
         self.dirty = True
+        if shown:
+            self._layout_dirty = True
 
         if updater:
-            s.a = _MyAnim(self.figure, updater, interval=200, arg=s)
+            self.scheduler.add(updater, s)
             #s.a = anim.FuncAnimation(self.figure, _ClosureWithArg(anim_func, s), frames=1, interval=200, repeat=True) #, blit=True)
 
         return s
 
+    def save(self, path, width = 1600, height = 900, dpi = 100, **kw):
+        """ render the window to an image file, the format follows from the extension """
+        self.figure.set_dpi(dpi)
+        self.figure.set_size_inches(width / dpi, height / dpi)
+
+        self.drain()
+        self.layout(width, height)
+        self.invalidate()
+        self.prepare_artists()
+        self.changed_streams = {}
+
+        self.figure.savefig(path, dpi=dpi, facecolor=self.figure.get_facecolor(), **kw)
+
     def destroy_stream(self, s):
         self.dirty = True
+        self._layout_dirty = True
         self.streams.remove(s)
+        self.dirty_streams.pop(s, None)
+        self.changed_streams.pop(s, None)
+        self.scheduler.remove(s)
+        for c in s.channels:
+            self.ingest_buffers.pop(id(c), None)
+        self.ring_readers = [r for r in self.ring_readers if not r.channel in s.channels]
         s.destroy()
 
-    def invalidate(self):
+    def ingest_buffer(self, channel):
+        """ thread-safe input of the channel, drained by the window once per frame """
+        buf = self.ingest_buffers.get(id(channel))
+        if buf is None:
+            buf = self.ingest_buffers[id(channel)] = IngestBuffer(channel, self.scheduler.notify)
+            self.scheduler.wake()
+        return buf
+
+    def attach_ring(self, channel, ring):
+        """ feed the channel from a shared memory ShmRing written by another process """
+        reader = RingReader(ring, channel)
+        self.ring_readers.append(reader)
+        self.scheduler.wake()
+        return reader
+
+    def record(self, path):
+        """ write every sample fed into the window to a file, see record.Player """
+        self.stop_recording()
+        self.recorder = Recorder(path)
+        return self.recorder
+
+    def stop_recording(self):
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    def drain(self):
+        count = 0
+        for buf in list(self.ingest_buffers.values()) + self.ring_readers:
+            if buf.pending:
+                # one failing channel must not keep the others waiting
+                try:
+                    count += buf.drain()
+                except Exception as e:
+                    print("Exception: ", e)
+                    print("======================================================================================")
+                    print(traceback.format_exc())
+                    print("======================================================================================")
+        return count
+
+    def invalidate(self, stream=None):
+        # stream: only that one changed, otherwise every stream is prepared in full
+        if stream is None:
+            self.dirty = True
+        else:
+            self.dirty_streams[stream] = None
+
+    def _on_page(self, i):
+        return not self.page_size or self.page * self.page_size <= i < (self.page + 1) * self.page_size
+
+    def pages(self):
+        if not self.page_size:
+            return 1
+        return max((len(self.streams) + self.page_size - 1) // self.page_size, 1)
+
+    def visible_streams(self):
+        return [s for i, s in enumerate(self.streams) if self._on_page(i)]
+
+    def set_page(self, page):
+        page = max(0, min(page, self.pages() - 1))
+        if page != self.page:
+            self.page = page
+            self.layout()
+            self.figure.canvas.draw_idle()
+
+    def layout(self, abs_w = None, abs_h = None):
+        """ show the streams of the current page, hide the others, and tile the shown ones """
+        if abs_w is None:
+            abs_w, abs_h = self.figure.bbox.width, self.figure.bbox.height
+
+        visible = self.visible_streams()
+        for s in self.streams:
+            if s.shown and not s in visible:
+                s.hide()
+        for s in visible:
+            s.show()
+
+        if self.blitter:
+            self.blitter.invalidate()
+        if visible:
+            self._calc_layout(visible, 0.0, 0.0, 1.0, 1.0, abs_w, abs_h)
+
+        self._layout_dirty = False
         self.dirty = True
 
     def _calc_layout(self, streams, x, y, w, h, abs_w, abs_h):
@@ -130,16 +269,72 @@ class Window:
     def prepare_artists(self):
 
         #print("win.invalidate, ", self.dirty)
-        if self.dirty:
+        if self._layout_dirty:
+            self.layout()
 
-            for s in self.streams:
-                s.prepare_artists()
+        if self.dirty or self.dirty_streams:
+            start = time.perf_counter() if self.profiler.enabled else None
 
+            if self.dirty:
+                streams = [s for s in self.streams if s.shown]
+                for s in streams:
+                    s.dirty = True
+            else:
+                streams = [s for s in self.dirty_streams if s.shown]
             self.dirty = False
+            self.dirty_streams = {}
+
+            for s in streams:
+                if s.prepare_artists():
+                    self.changed_streams[s] = None
+
+            if start is not None:
+                self.profiler.add(('prepare',), time.perf_counter() - start)
+
+    def render(self):
+        self.prepare_artists()
+        prof = self.profiler
+
+        changed, self.changed_streams = list(self.changed_streams), {}
+        if self.hud and self.hud.update() and self.blitter:
+            self.blitter.invalidate()
+
+        if self.blitter:
+            if not changed:
+                return
+            if prof.enabled:
+                done = prof.call(('blit',), self.blitter.update, changed)
+            else:
+                done = self.blitter.update(changed)
+            if done:
+                if self.hover:
+                    self.hover.redrawn(changed)
+                return
+
+        if prof.enabled:
+            # a synchronous draw, so that it is accounted to this frame
+            prof.call(('draw',), self.figure.canvas.draw)
+        else:
+            self.figure.canvas.draw_idle()
+
+    def toggle_hud(self):
+        """ show or hide the performance overlay, the profiler runs while it is shown """
+        if self.hud is None:
+            self.hud = Hud(self)
+
+        visible = not self.hud.visible
+        self.profiler.enable(visible)
+        self.hud.show(visible)
+        if self.blitter:
+            self.blitter.invalidate()
+        self.figure.canvas.draw_idle()
 
 
     def mouse_move(self, event):
-        if event.inaxes and event.inaxes.stream:
+        if self.hover:
+            stream = getattr(event.inaxes, 'stream', None)
+            self.hover.motion(stream, event.xdata if stream else None)
+        elif event.inaxes and event.inaxes.stream:
             event.inaxes.stream.mouse_move(event)
 
 
@@ -148,10 +343,15 @@ class Window:
         if not event.inaxes:
             return
 
-        if event.inaxes.stream:
+        if self.hover:
+            self.mouse_move(event)
+        elif event.inaxes.stream:
             event.inaxes.stream.mouse_enter(event)
 
     def mouse_leave(self, event):
+        if self.hover:
+            self.hover.leave()
+            return
 
         if event.inaxes.stream:
             event.inaxes.stream.mouse_leave(event)
@@ -193,11 +393,21 @@ class Window:
 
     def resize_event(self, event):
         #print("resize_event", event.width, event.height)
-        self._calc_layout(self.streams, 0.0, 0.0, 1.0, 1.0, event.width, event.height)
+        self.layout(event.width, event.height)
 
 
     def key_press(self, event):
 
+        if event.key == 'f12':
+            self.toggle_hud()
+            return
+        elif event.key == 'pagedown':
+            self.set_page(self.page + 1)
+            return
+        elif event.key == 'pageup':
+            self.set_page(self.page - 1)
+            return
+
         if event.inaxes and event.inaxes.stream:
             if event.key == 'h':
                 event.inaxes.stream.scale_to_default()
@@ -210,6 +420,7 @@ def event_loop():
     print("Use backend:", mpl.get_backend())
     for w in _all_windows:
         w.prepare_artists()
+        w.scheduler.start()
     plt.show()
 
 
@@ -0,0 +1,194 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import sys
+import unittest
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use('Agg')
+
+from sview.cold import ColdStore, Segment, SEGMENT, _CODECS
+from sview.window import Window
+
+
+def _brute(values):
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values) or np.isnan(values).all():
+        return (np.nan, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return (np.nanmin(values), np.nanmax(values))
+
+def _data(rng, n, integral=True):
+    """ times on whole microseconds with jitter (or not on them), a random walk with NaNs """
+    x = np.cumsum(rng.integers(1, 2000, size=n)).astype(np.float64) + 1.5e15
+    if not integral:
+        x += rng.random(n) * 0.5
+    y = np.cumsum(rng.standard_normal(n))
+    y[rng.random(n) < 0.02] = np.nan
+    return x, y
+
+
+class SegmentTest(unittest.TestCase):
+
+    def round_trip(self, x, y):
+        for codec, (compress, decompress) in _CODECS.items():
+            seg = Segment(x, y, compress)
+            dx, dy = seg.decode(decompress)
+            self.assertEqual(dy.dtype, y.dtype)
+            # bit for bit, NaN included
+            np.testing.assert_array_equal(dx.view(np.uint64), x.view(np.uint64), err_msg=codec)
+            np.testing.assert_array_equal(dy.view(dy.dtype.str.replace('f', 'u')), y.view(y.dtype.str.replace('f', 'u')))
+            self.assertEqual((seg.t0, seg.t1, seg.count), (x[0], x[-1], len(x)))
+            np.testing.assert_equal((seg.ymin, seg.ymax), _brute(y))
+
+    def test_integral_times(self):
+        x, y = _data(np.random.default_rng(1), 5000)
+        self.round_trip(x, y)
+
+    def test_fractional_times(self):
+        x, y = _data(np.random.default_rng(2), 5000, integral=False)
+        self.round_trip(x, y)
+
+    def test_float32_values(self):
+        x, y = _data(np.random.default_rng(3), 5000)
+        self.round_trip(x, y.astype(np.float32))
+
+    def test_all_nan_values(self):
+        x, y = _data(np.random.default_rng(4), 100)
+        y[:] = np.nan
+        self.round_trip(x, y)
+
+
+class ColdStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.x, self.y = _data(rng, 4 * SEGMENT + 100)
+        # a segment of NaNs only
+        self.y[SEGMENT:2 * SEGMENT] = np.nan
+        self.cold = ColdStore(cache=2)
+        for i in range(0, 4 * SEGMENT, SEGMENT):
+            self.cold.add(self.x[i:i + SEGMENT], self.y[i:i + SEGMENT])
+        self.x, self.y = self.x[:4 * SEGMENT], self.y[:4 * SEGMENT]
+        self.rng = rng
+
+    def points(self):
+        x = self.x
+        # segment edges, sample times, between samples and outside of the data
+        edges = [x[k] for i in range(0, len(x), SEGMENT) for k in (i - 1, i, i + 1) if 0 <= k < len(x)]
+        exact = list(x[self.rng.integers(0, len(x), size=20)])
+        between = list(x[0] + self.rng.random(20) * (x[-1] - x[0]))
+        return edges + exact + between + [x[0] - 10, x[-1] + 10]
+
+    def test_y_range(self):
+        points = sorted(self.points())
+        for k in range(300):
+            x0, x1 = sorted(self.rng.choice(points, size=2))
+            expected = _brute(self.y[(self.x >= x0) & (self.x <= x1)])
+            np.testing.assert_equal(self.cold.y_range(x0, x1), expected, err_msg=str((x0, x1)))
+
+    def test_around(self):
+        x, y = self.x, self.y
+        for t in self.points():
+            k = int(np.searchsorted(x, t, side='right'))
+            before = (x[k - 1], y[k - 1]) if k else None
+            after = (x[k], y[k]) if k < len(x) else None
+            np.testing.assert_equal(self.cold.around(t), (before, after), err_msg=str(t))
+
+    def test_drop_front(self):
+        self.cold.drop_front(1)
+        self.assertEqual(len(self.cold), 3 * SEGMENT)
+        self.assertEqual(self.cold.first(), self.x[SEGMENT])
+        np.testing.assert_equal(self.cold.bounds(), _brute(self.y[SEGMENT:]))
+
+
+class HotPointsTest(unittest.TestCase):
+    """ a line with hot_points answers like the same data kept in memory """
+
+    def test_against_plain_line(self):
+        rng = np.random.default_rng(6)
+        x, y = _data(rng, 3 * SEGMENT + 5000)
+
+        win = Window(headless=True)
+        ax = win.create_stream('s').add_axes("%.2f")
+        plain = ax.add_line('plain')
+        tiered = ax.add_line('tiered', hot_points=1000)
+        for i in range(0, len(x), 1000):
+            plain.update_from_arrays(x[i:i + 1000], y[i:i + 1000])
+            tiered.update_from_arrays(x[i:i + 1000], y[i:i + 1000])
+
+        self.assertGreater(len(tiered._cold), 0)
+        self.assertEqual(len(tiered._cold) + len(tiered.datax), len(plain.datax))
+        np.testing.assert_equal(tiered.data_bounds(), plain.data_bounds())
+
+        px = plain.datax
+        edges = [s.t0 for s in tiered._cold.segments] + [s.t1 for s in tiered._cold.segments] + [tiered.datax[0]]
+        points = edges + list(px[rng.integers(0, len(px), size=30)]) + \
+            list(px[0] + rng.random(30) * (px[-1] - px[0])) + [px[0] - 10, px[-1] + 10]
+
+        for t in points:
+            for before in (False, True):
+                np.testing.assert_equal(tiered.sample_at(t, before), plain.sample_at(t, before), err_msg=str((t, before)))
+
+        points.sort()
+        for k in range(200):
+            x0, x1 = sorted(rng.choice(points, size=2))
+            np.testing.assert_equal(tiered.view_range(x0, x1), plain.view_range(x0, x1), err_msg=str((x0, x1)))
+
+        width = px[-1] - px[0] + 1
+        for x0 in points:
+            if x0 >= px[-1] - width:
+                np.testing.assert_equal(tiered.window_range(width, x0), plain.window_range(width, x0), err_msg=str(x0))
+
+    def test_view(self):
+        # update_view draws the cold segments: whole ones when zoomed in, the summaries zoomed out
+        rng = np.random.default_rng(7)
+        x, y = _data(rng, 3 * SEGMENT)
+        win = Window(headless=True)
+        win.figure.set_size_inches(8, 4)
+        s = win.create_stream('s')
+        line = s.add_axes("%.2f").add_line('tiered', hot_points=1000)
+        line.update_from_arrays(x, y)
+        win.layout(800, 400)
+        win.prepare_artists()
+
+        k0, k1 = SEGMENT + 100, SEGMENT + 400
+        s.axes[0].set_xlim(x[k0], x[k1])
+        dx = line.artist.get_xdata()
+        inside = dx[(dx >= x[k0]) & (dx <= x[k1])]
+        np.testing.assert_array_equal(inside, x[k0:k1 + 1])
+
+        s.axes[0].set_xlim(x[0], x[-1])
+        dx = line.artist.get_xdata()
+        self.assertEqual((dx[0], dx[-1]), (x[0], x[-1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use('Agg')
+
+from sview.window import Window
+
+
+def _signal(rng, n):
+    """ noise on a random walk, flat runs, jumps and NaNs """
+    t = np.cumsum(rng.integers(1, 1000, size=n)).astype(np.float64) + 1e12
+    v = np.cumsum(rng.standard_normal(n) * 0.3) + rng.standard_normal(n) * 0.1 + 100.0
+    v[n // 4:n // 4 + 200] = 42.0
+    v[n // 2:] += 50.0
+    v[rng.random(n) < 0.01] = np.nan
+    return t, v
+
+def _drawn(x, y, t, steps):
+    """ value of the line through the stored points at the times t """
+    i = np.searchsorted(x, t, side='right') - 1
+    exact = x[i] == t
+    if steps:
+        return y[i]
+    j = np.minimum(i + 1, len(x) - 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        w = (t - x[i]) / (x[j] - x[i])
+        r = y[i] + (y[j] - y[i]) * w
+    return np.where(exact, y[i], r)
+
+
+class CompressTest(unittest.TestCase):
+
+    def channel(self, **kw):
+        win = Window(headless=True)
+        return win.create_stream('s').add_axes("%.2f").add_line('c', **kw)
+
+    def check(self, mode, max_error, steps):
+        for batch in (1, 100):
+            rng = np.random.default_rng(len(mode) + batch)
+            t, v = _signal(rng, 20000)
+            kw = dict(drawstyle='steps-post') if steps else {}
+            ch = self.channel(compress=mode, max_error=max_error, **kw)
+            if batch == 1:
+                for tm, value in zip(t.tolist(), v.tolist()):
+                    ch.update_from_str(tm, value)
+            else:
+                for i in range(0, len(t), batch):
+                    ch.update_from_arrays(t[i:i + batch], v[i:i + batch])
+
+            x, y = ch.datax, ch.datay
+            self.assertGreater(ch.compression_ratio, 2.0)
+            self.assertEqual(np.isnan(y).sum(), np.isnan(v).sum())
+
+            valid = ~np.isnan(v)
+            d = _drawn(x, y, t[valid], steps)
+            a = v[valid]
+            if mode == 'deadband_rel':
+                # relative to the held value, that is the drawn one
+                bound = max_error * np.abs(d)
+            else:
+                bound = max_error
+            err = np.abs(a - d)
+            self.assertTrue(np.all(err <= bound + 1e-9), (mode, batch, steps, np.max(err - bound)))
+
+    def test_deadband(self):
+        self.check('deadband', 0.5, steps=False)
+        self.check('deadband', 0.5, steps=True)
+
+    def test_deadband_rel(self):
+        self.check('deadband_rel', 0.005, steps=False)
+        self.check('deadband_rel', 0.005, steps=True)
+
+    def test_swinging_door(self):
+        self.check('swinging_door', 0.5, steps=False)
+
+    def test_swinging_door_rejects_steps(self):
+        for drawstyle in ('steps', 'steps-pre', 'steps-mid', 'steps-post'):
+            with self.assertRaises(Exception):
+                self.channel(compress='swinging_door', max_error=0.5, drawstyle=drawstyle)
+        self.channel(compress='deadband', max_error=0.5, drawstyle='steps-post')
+
+
+if __name__ == '__main__':
+    unittest.main()
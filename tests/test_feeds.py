@@ -0,0 +1,109 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use('Agg')
+
+from sview.feeds import Feeds
+from sview.window import Window
+
+
+class _Server:
+    """ local TCP server, every accepted connection is sent the next batch of lines and closed """
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(4)
+        self.port = self.sock.getsockname()[1]
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        while self.batches:
+            conn, _ = self.sock.accept()
+            conn.sendall(self.batches.pop(0).encode('utf-8'))
+            conn.close()
+
+    def close(self):
+        self.sock.close()
+
+
+def _wait(cond, timeout=10.0):
+    end = time.time() + timeout
+    while not cond():
+        if time.time() > end:
+            raise Exception("timed out")
+        time.sleep(0.01)
+
+
+class FeedsTest(unittest.TestCase):
+
+    def test_records_errors_and_reconnect(self):
+        win = Window(headless=True)
+        ax = win.create_stream('s').add_axes("%.2f")
+        a = ax.add_line('a', marker='o')
+        log = ax.add_text_channel('log')
+
+        server = _Server(["a 1000 1\n"
+                          "a 2000 2\n"
+                          "nosuch 2500 7\n"
+                          "a 3000 oops\n"
+                          "broken\n"
+                          "log 3500 two words\n",
+                          "a 4000 4\n"
+                          "a 5000 5\n"])
+
+        feeds = Feeds(win, min_delay=0.01, max_delay=0.05)
+        feeds.add_channel('a', a)
+        feeds.add_channel('log', log)
+        stats = feeds.tcp('127.0.0.1', server.port)
+        feeds.start()
+        try:
+            _wait(lambda: stats.records == 5 and stats.connects >= 2)
+        finally:
+            feeds.stop()
+            server.close()
+
+        self.assertEqual(stats.unknown, 1)
+        self.assertEqual(stats.errors, 2)
+
+        # the malformed value is dropped alone, the other samples all arrive
+        win.drain()
+        self.assertEqual(list(a.datax), [1000.0, 2000.0, 4000.0, 5000.0])
+        self.assertEqual(list(a.datay), [1.0, 2.0, 4.0, 5.0])
+        self.assertEqual(log.data, ['two words'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import sys
+import unittest
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sview.minmax import MinMaxIndex, SlidingMinMax
+from sview.series import Series
+
+
+def _brute(values):
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values) or np.isnan(values).all():
+        return (np.nan, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return (np.nanmin(values), np.nanmax(values))
+
+def _values(rng, n):
+    """ a random walk with single NaNs and, now and then, a run of NaNs longer than a block """
+    v = np.cumsum(rng.standard_normal(n))
+    v[rng.random(n) < 0.05] = np.nan
+    if n > 300 and rng.random() < 0.5:
+        k = int(rng.integers(0, n - 200))
+        v[k:k + 200] = np.nan
+    return v
+
+
+class MinMaxIndexTest(unittest.TestCase):
+
+    def check(self, index, ref, rng):
+        self.assertEqual(len(index), len(ref))
+        n = len(ref)
+        ranges = [(0, n), (0, 1), (n - 1, n), (-5, n + 5)]
+        for _ in range(30):
+            i, j = sorted(rng.integers(0, n + 1, size=2))
+            ranges.append((int(i), int(j)))
+        for i, j in ranges:
+            np.testing.assert_equal(index.query(ref, i, j), _brute(ref[max(i, 0):j]), err_msg=str((i, j, n)))
+
+    def test_operations_against_brute_force(self):
+        rng = np.random.default_rng(1)
+        index = MinMaxIndex()
+        ref = np.empty(0)
+        for step in range(300):
+            op = rng.random()
+            if op < 0.3:
+                v = _values(rng, 1)[0]
+                index.append(v)
+                ref = np.append(ref, v)
+            elif op < 0.7:
+                v = _values(rng, int(rng.integers(1, 6000)))
+                index.extend(v)
+                ref = np.concatenate((ref, v))
+            elif op < 0.85:
+                k = int(rng.integers(0, len(ref) // 2 + 1))
+                index.drop_front(k)
+                ref = ref[k:]
+            else:
+                k = int(rng.integers(0, len(ref) + 1))
+                ref = ref[:k]
+                index.truncate(ref, k)
+            if len(ref):
+                self.check(index, ref, rng)
+        self.assertGreater(index.appended, 100000)
+
+    def test_all_nan(self):
+        index = MinMaxIndex()
+        ref = np.full(10000, np.nan)
+        index.extend(ref)
+        np.testing.assert_equal(index.query(ref, 0, len(ref)), (np.nan, np.nan))
+        ref = np.append(ref, 3.0)
+        index.append(3.0)
+        self.assertEqual(index.query(ref, 0, len(ref)), (3.0, 3.0))
+        np.testing.assert_equal(index.query(ref, 0, len(ref) - 1), (np.nan, np.nan))
+
+
+class SlidingMinMaxTest(unittest.TestCase):
+
+    def test_against_brute_force(self):
+        rng = np.random.default_rng(2)
+        width = 500.0
+        window = SlidingMinMax(width)
+        x = np.empty(0)
+        y = np.empty(0)
+        for step in range(200):
+            n = int(rng.integers(1, 300))
+            # repeated times included
+            bx = (x[-1] if len(x) else 0.0) + np.cumsum(rng.integers(0, 3, size=n)).astype(np.float64)
+            by = _values(rng, n)
+            window.extend(bx, by)
+            x = np.concatenate((x, bx))
+            y = np.concatenate((y, by))
+
+            for x0 in [x[-1] - width, x[-1]] + list(x[-1] - rng.random(5) * width):
+                np.testing.assert_equal(window.query(x0), _brute(y[x >= x0]), err_msg=str(x0))
+
+
+class SeriesTest(unittest.TestCase):
+
+    def check(self, series, x, y, rng):
+        np.testing.assert_array_equal(series.x.view(), x)
+        np.testing.assert_array_equal(series.y.view(), y)
+        n = len(x)
+        for _ in range(10):
+            i, j = sorted(rng.integers(0, n + 1, size=2))
+            np.testing.assert_equal(series.y_range(i, j), _brute(y[i:j]))
+        if n:
+            # one width: the window is fed incrementally from call to call
+            width = 1000.0
+            for x0 in (x[-1] - width, x[-1] - width / 3, x[-1]):
+                np.testing.assert_equal(series.window_range(width, x0), _brute(y[x >= x0]), err_msg=str(x0))
+
+    def test_operations_against_brute_force(self):
+        rng = np.random.default_rng(3)
+        series = Series()
+        x = np.empty(0)
+        y = np.empty(0)
+        dropped = False
+        t = 0.0
+        for step in range(400):
+            op = rng.random()
+            if op < 0.4:
+                n = int(rng.integers(1, 200))
+                bx = t + np.cumsum(rng.integers(0, 3, size=n)).astype(np.float64)
+                by = _values(rng, n)
+                series.extend(bx, by)
+                x, y, t = np.concatenate((x, bx)), np.concatenate((y, by)), bx[-1]
+            elif op < 0.6 and len(x):
+                # late samples, some of them older than the horizon after a drop
+                n = int(rng.integers(1, 50))
+                lx = np.sort(x[-1] - rng.random(n) * 300)
+                ly = _values(rng, n)
+                horizon = series.horizon()
+                series.add_late_many(lx, ly)
+                series.merge_late()
+                keep = lx >= horizon
+                lx, ly = lx[keep], ly[keep]
+                # late samples go after stored ones of the same time
+                pos = np.searchsorted(x, lx, side='right')
+                x, y = np.insert(x, pos, lx), np.insert(y, pos, ly)
+            elif op < 0.75:
+                k = int(rng.integers(0, len(x) // 3 + 1))
+                series.drop_front(k)
+                x, y = x[k:], y[k:]
+                dropped = dropped or k > 0
+            elif op < 0.9 and len(x):
+                # a compressor replacing the last sample
+                k = len(x) - int(rng.integers(1, 3))
+                series.truncate(k)
+                x, y = x[:k], y[:k]
+            else:
+                v = _values(rng, 1)[0]
+                t += 1.0
+                series.append(t, v)
+                x, y = np.append(x, t), np.append(y, v)
+            self.check(series, x, y, rng)
+        self.assertTrue(dropped)
+
+    def test_horizon(self):
+        series = Series()
+        series.extend(np.arange(10.0), np.arange(10.0))
+        self.assertEqual(series.horizon(), -np.inf)
+        series.drop_front(4)
+        self.assertEqual(series.horizon(), 4.0)
+        self.assertFalse(series.add_late(3.0, 1.0))
+        series.add_late(5.5, 100.0)
+        self.assertTrue(series.merge_late())
+        self.assertFalse(series.merge_late())
+        self.assertEqual(list(series.x.view()), [4.0, 5.0, 5.5, 6.0, 7.0, 8.0, 9.0])
+        self.assertEqual(series.y_range(0, len(series)), (4.0, 100.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2016 Ivan Gavrilin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use('Agg')
+
+import sview.stream
+from sview.window import Window
+
+
+class SchedulerTest(unittest.TestCase):
+
+    def test_backoff_and_notify(self):
+        win = Window(headless=True)
+        sched = win.scheduler
+        line = win.create_stream('s').add_axes("%.2f").add_line('a')
+        buf = win.ingest_buffer(line)
+
+        for i in range(40):
+            # as if the poll interval had passed
+            sched._next_poll = 0.0
+            sched.tick()
+        self.assertEqual(sched.interval, sched.idle_interval)
+        # the timer keeps its pace, only the polls are spaced out
+        self.assertEqual(sched.timer.interval, int(sched.frame_interval))
+
+        polls = []
+        poll = sched.poll
+        sched.poll = lambda: polls.append(1) or poll()
+        sched.tick()
+        self.assertEqual(polls, [])
+
+        t = threading.Thread(target=buf.put_many, args=([1000.0, 2000.0], [1.0, 2.0]))
+        t.start()
+        t.join()
+        sched.tick()
+        self.assertEqual(polls, [1])
+        self.assertEqual(list(line.datax), [1000.0, 2000.0])
+        self.assertEqual(sched.interval, sched.frame_interval)
+
+        # more samples in a buffer that is not empty do not notify again
+        buf.put(3000.0, 3.0)
+        buf.put(4000.0, 4.0)
+        self.assertTrue(sched._notified)
+        sched.tick()
+        self.assertFalse(sched._notified)
+
+    def test_zoom_timeout(self):
+        win = Window(headless=True)
+        s = win.create_stream('s')
+        line = s.add_axes("%.2f").add_line('a')
+        line.update_from_arrays([1000.0, 2000.0, 3000.0], [1.0, 3.0, 2.0])
+        win.layout(800, 400)
+        win.prepare_artists()
+        full = s.axes[0].get_xlim()
+
+        timeout = sview.stream._ZOOM_TIMEOUT
+        sview.stream._ZOOM_TIMEOUT = 0.05
+        try:
+            s.on_zoomed()
+        finally:
+            sview.stream._ZOOM_TIMEOUT = timeout
+        s.set_xrange(1500.0, 2500.0)
+        win.invalidate(s)
+
+        # a zoomed stream does not queue itself for the next frame
+        win.prepare_artists()
+        self.assertEqual(win.dirty_streams, {})
+        self.assertEqual(s.axes[0].get_xlim(), (1500.0, 2500.0))
+
+        time.sleep(0.1)
+        win.scheduler.tick()
+        self.assertIsNone(s.custom_scale_till_time)
+        self.assertEqual(s.axes[0].get_xlim(), full)
+
+
+if __name__ == '__main__':
+    unittest.main()